@@ -0,0 +1,1251 @@
+"""
+Бенчмарки MindWell
+Запуск: python benchmarks.py [--sizes 10000,100000,1000000] [--only chart,storage] [--json out.json]
+
+Без дисплея: SDL_VIDEODRIVER=offscreen или KIVY_GL_BACKEND=mock.
+JSON-отчёт двух коммитов сравнивается по одинаковым ключам bench/size/metric.
+"""
+
+import argparse
+import faulthandler
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+os.environ.setdefault('KIVY_NO_ARGS', '1')
+os.environ.setdefault('KIVY_NO_CONSOLELOG', '1')
+os.environ.setdefault('KCFG_GRAPHICS_MAXFPS', '0')  # кадры без ожидания до 60 fps
+
+from mindwell import DataManager, MoodHistory, MoodRollups, SQLiteStorage, count_instructions
+
+# Kivy перенаправляет stderr в свой логгер — возвращаем, чтобы видеть ошибки
+sys.stderr = sys.__stderr__
+
+DAY = 24 * 3600
+
+def generate_moods(count, start_ts=1_600_000_000.0):
+    """Синтетическая история: несколько записей в день"""
+    rng = random.Random(count)
+    ts = start_ts
+    for _ in range(count):
+        ts += rng.uniform(0, DAY / 2)
+        yield ts, rng.randint(1, 5), ''
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+def bench_storage(sizes, appends=1000, queries=100):
+    """Открытие, дозапись и запросы по диапазону при разных объёмах истории"""
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'bench.db')
+            storage = SQLiteStorage(path)
+            rows = list(generate_moods(size))
+            storage.append_moods(rows)
+            storage.close()
+
+            # Первое открытие считает и сохраняет агрегаты, дальше они читаются
+            first_open_time, manager = timed(DataManager, path)
+            manager.close()
+            open_time, manager = timed(DataManager, path)
+
+            start = time.perf_counter()
+            for i in range(appends):
+                manager.save_mood(i % 5 + 1)
+            append_time = (time.perf_counter() - start) / appends
+
+            first, last = rows[0][0], rows[-1][0]
+            rng = random.Random(size)
+            start = time.perf_counter()
+            for _ in range(queries):
+                lo = rng.uniform(first, last)
+                list(manager.storage.iter_moods(lo, lo + 7 * DAY))
+            query_time = (time.perf_counter() - start) / queries
+
+            start = time.perf_counter()
+            for _ in range(queries):
+                lo = rng.uniform(first, last)
+                manager.moods_between(lo, lo + 7 * DAY)
+            index_time = (time.perf_counter() - start) / queries
+            manager.close()
+
+        results[size] = {
+            'first_open_s': first_open_time,
+            'open_s': open_time,
+            'append_us': append_time * 1e6,
+            'save_mood_per_s': 1 / append_time,
+            'query_week_us': query_time * 1e6,
+            'index_week_us': index_time * 1e6,
+        }
+    return results
+
+def measure_memory(build):
+    """Память (байт), удерживаемая результатом build()"""
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current
+
+def bench_memory(sizes):
+    """Список словарей (старый формат) против колоночной MoodHistory"""
+    import datetime
+    results = {}
+    for size in sizes:
+        rows = list(generate_moods(size))
+
+        def build_dicts():
+            return [
+                {'date': datetime.datetime.fromtimestamp(ts).isoformat(), 'mood': mood, 'note': note}
+                for ts, mood, note in rows
+            ]
+
+        def build_columns():
+            history = MoodHistory()
+            history.load((i, ts, mood) for i, (ts, mood, note) in enumerate(rows))
+            return history
+
+        dicts = measure_memory(build_dicts)
+        columns = measure_memory(build_columns)
+        results[size] = {
+            'dicts_mb': dicts / 2 ** 20,
+            'columns_mb': columns / 2 ** 20,
+            'bytes_per_entry_dicts': dicts / size,
+            'bytes_per_entry_columns': columns / size,
+        }
+    return results
+
+def brute_force_rollups(rows):
+    """Эталонный пересчёт агрегатов полным проходом по истории"""
+    import datetime
+    buckets = {period: {} for period in MoodRollups.PERIODS}
+    hours = [[0, 0] for _ in range(24)]
+    for ts, mood, _ in rows:
+        moment = datetime.datetime.fromtimestamp(ts)
+        for period, key in MoodRollups.period_keys(moment.date()):
+            buckets[period].setdefault(key, []).append((ts, mood))
+        hour = hours[moment.hour]
+        hour[0] += 1
+        hour[1] += mood
+    return hours, {
+        period: {
+            key: {
+                'count': len(items),
+                'sum': sum(m for _, m in items),
+                'min': min(m for _, m in items),
+                'max': max(m for _, m in items),
+                'last': max(items)[1],
+                'last_ts': max(items)[0],
+            }
+            for key, items in groups.items()
+        }
+        for period, groups in buckets.items()
+    }
+
+def bench_rollups(sizes):
+    """Инкрементальные агрегаты: стоимость add(), rebuild() и сверка с полным пересчётом"""
+    results = {}
+    for size in sizes:
+        rows = list(generate_moods(size))
+        history = MoodHistory()
+        history.load((i, ts, mood) for i, (ts, mood, _) in enumerate(rows))
+
+        rollups = MoodRollups()
+        rebuild_time, _ = timed(rollups.rebuild, history.timestamps, history.moods)
+
+        incremental = MoodRollups()
+        start = time.perf_counter()
+        for ts, mood, _ in rows:
+            incremental.add(ts, mood)
+        add_time = (time.perf_counter() - start) / size
+
+        hours, expected = brute_force_rollups(rows)
+        expected_hours = ([count for count, _ in hours], [total for _, total in hours])
+        if (rollups.buckets != expected or incremental.buckets != expected
+                or (rollups.hour_counts, rollups.hour_sums) != expected_hours
+                or (incremental.hour_counts, incremental.hour_sums) != expected_hours):
+            raise AssertionError(f'rollups diverge from brute force at {size} entries')
+
+        # Сохранённые дни и часы: старт читает их вместо пересчёта истории
+        storage = SQLiteStorage()
+        storage.execute_batch([(SQLiteStorage.INSERT_MOOD_DAY, rollups.day_rows()),
+                               (SQLiteStorage.INSERT_MOOD_HOUR, rollups.hour_rows())])
+        loaded = MoodRollups()
+        load_time, _ = timed(loaded.load, storage.mood_day_totals(), storage.mood_hour_totals())
+        storage.close()
+        if loaded.buckets != expected or (loaded.hour_counts, loaded.hour_sums) != expected_hours:
+            raise AssertionError(f'loaded rollups diverge from brute force at {size} entries')
+
+        results[size] = {'rebuild_s': rebuild_time, 'load_s': load_time, 'add_us': add_time * 1e6}
+
+    # save_mood дописывает итоги в той же транзакции: после перезапуска они равны пересчёту
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rollups.db')
+        storage = SQLiteStorage(path)
+        storage.append_moods(generate_moods(1000))
+        storage.close()
+        manager = DataManager(path)  # старая база без агрегатов: пересчёт и запись
+        for i in range(100):
+            manager.save_mood(i % 5 + 1)
+        manager.close()
+        manager = DataManager(path)
+        loaded = manager.rollups
+        manager.rebuild_rollups()
+        if (loaded.buckets, loaded.hour_counts, loaded.hour_sums) != (
+                manager.rollups.buckets, manager.rollups.hour_counts, manager.rollups.hour_sums):
+            raise AssertionError('persisted rollups diverge from a rebuild after save_mood')
+        manager.close()
+    return results
+
+class SlowStorage(SQLiteStorage):
+    """Хранилище с медленным диском: каждый коммит ждёт, как fsync на дешёвой флеш-памяти"""
+    COMMIT_DELAY = 0.02
+
+    def execute_batch(self, statements):
+        time.sleep(self.COMMIT_DELAY)
+        super().execute_batch(statements)
+
+class SlowDataManager(DataManager):
+    storage_class = SlowStorage
+
+def bench_write_behind(saves=200, interval=0.002):
+    """Время UI-потока на save_mood при медленном диске: синхронная запись и write-behind"""
+    from kivy.clock import Clock
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, path in (('sync', None), ('write_behind', os.path.join(tmp, 'slow.db'))):
+            manager = SlowDataManager(path)
+            done = []
+            save_times = []
+            for i in range(saves):
+                start = time.perf_counter()
+                manager.save_mood(i % 5 + 1, callback=done.append)
+                save_times.append((time.perf_counter() - start) * 1e3)
+                time.sleep(interval)  # пользователь и UI между сохранениями
+            flush_time, _ = timed(manager.flush)
+            Clock.tick()  # доставить колбэки в «UI-поток»
+            commits = manager.writer.commits
+            manager.close()
+            if path:
+                stored = SQLiteStorage(path)
+                count = stored.count_moods()
+                stored.close()
+            else:
+                count = saves
+            if len(done) != saves or any(done) or count != saves:
+                raise AssertionError(f'{mode}: {len(done)} callbacks, {count} rows for {saves} saves')
+            results[mode] = {
+                'save_ms_median': percentile(save_times, 0.5),
+                'save_ms_max': max(save_times),
+                'commits': commits,
+                'flush_ms': flush_time * 1e3,
+            }
+    return results
+
+class BrokenDiskStorage(SQLiteStorage):
+    """Коммит падает не-sqlite ошибкой (сбой драйвера, кривые параметры)"""
+    def execute_batch(self, statements):
+        raise TypeError('broken disk')
+
+class UnopenableStorage(SQLiteStorage):
+    """База не открывается из потока-писателя (права, блокировка файла)"""
+    def __init__(self, path):
+        if threading.current_thread().name == 'mindwell-writer':
+            raise sqlite3.OperationalError('unable to open database file')
+        super().__init__(path)
+
+def finishes(func, timeout=5.0):
+    """Время вызова func; если он завис, процесс падает с трассировкой стека"""
+    # Вызов остаётся в этом потоке: соединение SQLite привязано к создавшему его потоку
+    faulthandler.dump_traceback_later(timeout, exit=True)
+    try:
+        return timed(func)[0]
+    finally:
+        faulthandler.cancel_dump_traceback_later()
+
+def bench_writer_failures(saves=20):
+    """Сбойное хранилище: flush() и close() возвращаются, ошибки доходят до колбэков"""
+    from kivy.clock import Clock
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode, storage_class in (('commit_fails', BrokenDiskStorage), ('open_fails', UnopenableStorage)):
+            manager = type('FailingDataManager', (DataManager,), {'storage_class': storage_class})(
+                os.path.join(tmp, f'{mode}.db'))
+            done = []
+            for i in range(saves):
+                manager.save_mood(i % 5 + 1, callback=done.append)
+            flush_time = finishes(manager.flush)
+            close_time = finishes(manager.close)
+            Clock.tick()
+            errors = sum(error is not None for error in done)
+            stored = SQLiteStorage(os.path.join(tmp, f'{mode}.db'))
+            count = stored.count_moods()
+            stored.close()
+            # Коммит падает — каждый колбэк получает ошибку; база не открылась —
+            # записи идут синхронно через соединение UI-потока
+            expected = (saves, 0) if mode == 'commit_fails' else (0, saves)
+            if len(done) != saves or (errors, count) != expected:
+                raise AssertionError(f'{mode}: {len(done)} callbacks, {errors} errors, {count} rows')
+            results[mode] = {'flush_ms': flush_time * 1e3, 'close_ms': close_time * 1e3,
+                             'errors': errors, 'rows': count}
+    return results
+
+def bench_transfer(sizes):
+    """Экспорт в JSON Lines/CSV, импорт в пустую базу, повторный импорт (все дубликаты)"""
+    results = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            storage = SQLiteStorage(os.path.join(tmp, 'source.db'))
+            storage.append_moods(generate_moods(size))
+            storage.close()
+            source = DataManager(os.path.join(tmp, 'source.db'))
+            # Попытки в том виде, как их пишет игра: 0 мс, промах, обычная реакция
+            for reaction_ms in (0.0, None, 250.5):
+                source.save_trial(1_600_000_000.0, reaction_ms)
+            source.add_meditation_session(1_600_000_000.0, 60.0, 3)
+            jsonl, csv_path = os.path.join(tmp, 'export.jsonl'), os.path.join(tmp, 'export.csv')
+            with open(jsonl, 'w', encoding='utf-8') as f:
+                jsonl_time, exported = timed(source.export_jsonl, f)
+            with open(csv_path, 'w', encoding='utf-8', newline='') as f:
+                csv_time, _ = timed(source.export_csv, f)
+            source_trials = list(source.storage.iter_trials())
+            source.close()
+
+            target = DataManager(os.path.join(tmp, 'target.db'))
+            with open(jsonl, encoding='utf-8') as f:
+                import_time, first = timed(target.import_jsonl, f)
+            with open(jsonl, encoding='utf-8') as f:
+                again_time, second = timed(target.import_jsonl, f)
+            loaded = len(target.mood_history)
+            target.flush()
+            target_trials = list(target.storage.iter_trials())
+            target.close()
+
+            target = DataManager(os.path.join(tmp, 'csv.db'))
+            with open(csv_path, encoding='utf-8', newline='') as f:
+                csv_import_time, from_csv = timed(target.import_csv, f)
+            target.close()
+
+            # Память потоковой части импорта, без перестройки истории в памяти
+            # (tracemalloc замедляет, поэтому отдельным прогоном)
+            target = DataManager(os.path.join(tmp, 'memory.db'))
+            target.reload = lambda: None
+            with open(jsonl, encoding='utf-8') as f:
+                tracemalloc.start()
+                target.import_jsonl(f)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            target.close()
+        if (first['imported'] != exported or first['invalid'] or second['imported'] or loaded != size
+                or from_csv['imported'] != size):
+            raise AssertionError(f'transfer mismatch at {size}: {first}, {second}, {from_csv}')
+        if target_trials != source_trials:
+            raise AssertionError(f'trials changed in round trip: {source_trials} -> {target_trials}')
+        results[size] = {
+            'export_jsonl_per_s': exported / jsonl_time,
+            'export_csv_per_s': size / csv_time,
+            'import_jsonl_per_s': exported / import_time,
+            'import_csv_per_s': size / csv_import_time,
+            'reimport_dupes_per_s': exported / again_time,
+            'import_peak_mb': peak / 2 ** 20,
+        }
+    return results
+
+def bench_settings_import():
+    """Импорт битых и чужих настроек, затем запуск приложения на этой базе"""
+    malformed = [
+        {'type': 'setting', 'key': 'transition_level', 'value': 'x'},
+        {'type': 'setting', 'key': 'transition_level', 'value': 7},
+        {'type': 'setting', 'key': 'meditation_sessions', 'value': 'many'},
+        {'type': 'setting', 'key': 'concentration_score', 'value': True},
+        {'type': 'setting', 'key': 'language', 'value': '../../etc/passwd'},
+        {'type': 'setting', 'key': 'language', 'value': ['en']},
+        {'type': 'setting', 'key': 'unknown', 'value': 1},
+    ]
+    valid = [{'type': 'setting', 'key': 'concentration_score', 'value': 12}]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'mindwell.db')
+        manager = DataManager(path)
+        result = manager.import_records(malformed + valid)
+        manager.close()
+        # Базы, куда битые значения попали до проверки, тоже должны открываться
+        storage = SQLiteStorage(path)
+        storage.set_value('meditation_sessions', 'many')
+        storage.close()
+
+        app = make_app(tmp)
+        root = app.build()
+        for name in list(root.factories):
+            root.get_screen(name)
+        data = app.data_manager.data
+        app.data_manager.add_meditation_session(time.time(), 60)
+        app.data_manager.update_concentration_score(13)
+        started = (app.router.level, data['language'], data['meditation_sessions'],
+                   data['concentration_score'])
+        app.on_stop()
+    if result['invalid'] != len(malformed) or result['imported'] != len(valid):
+        raise AssertionError(f'malformed settings were imported: {result}')
+    if started != (0, 'en', 1, 13):
+        raise AssertionError(f'app started with bad settings: {started}')
+    return {'settings': {'rejected': result['invalid'], 'imported': result['imported']}}
+
+def bench_analytics(sizes, trials=20000):
+    """Аналитика настроения с NumPy и без: дневной ряд, каждый расчёт поверх него, повтор из кэша"""
+    from mindwell import MoodAnalytics
+    results = {}
+    for size in sizes:
+        manager = DataManager()
+        manager.mood_history.load(
+            (i, ts, mood) for i, (ts, mood, _) in enumerate(generate_moods(size))
+        )
+        manager.rollups.rebuild(manager.mood_history.timestamps, manager.mood_history.moods)
+        rng = random.Random(size)
+        first, last = manager.mood_history.timestamps[0], manager.mood_history.timestamps[-1]
+        manager.storage.conn.executemany(
+            'INSERT INTO trial (session_ts, ts, reaction_ms) VALUES (?, ?, ?)',
+            ((0, rng.uniform(first, last), rng.uniform(150, 600)) for _ in range(trials))
+        )
+        manager.rebuild_trial_totals()
+        manager.concentration_log.load(manager.storage)
+        row = {}
+        summaries = {}
+        for mode, use_numpy in (('numpy', None), ('python', False)):
+            analytics = MoodAnalytics(manager, use_numpy)
+            if mode == 'numpy' and not analytics.np:
+                continue
+            row[f'{mode}_series_ms'] = timed(analytics.day_series)[0] * 1e3
+            for name, compute in (
+                ('rolling', lambda: analytics.rolling_average(7, days=30)),
+                ('weekdays', analytics.weekday_pattern),
+                ('streaks', analytics.streaks),
+                ('volatility', analytics.volatility),
+                ('correlation', lambda: analytics.correlation('concentration')),
+            ):
+                row[f'{mode}_{name}_ms'] = timed(compute)[0] * 1e3
+            row[f'{mode}_cached_us'] = timed(analytics.summary)[0] * 1e6
+            summaries[mode] = analytics.summary()
+        manager.close()
+        if len(summaries) == 2 and not summaries_match(summaries['numpy'], summaries['python']):
+            raise AssertionError(f'numpy and python analytics differ at {size} entries')
+        results[size] = row
+    return results
+
+def summaries_match(a, b, tolerance=1e-9):
+    """Сравнить вложенные результаты аналитики с допуском для чисел с плавающей точкой"""
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(summaries_match(a[k], b[k]) for k in a)
+    if isinstance(a, (list, tuple)):
+        return len(a) == len(b) and all(summaries_match(x, y) for x, y in zip(a, b))
+    if isinstance(a, float) or isinstance(b, float):
+        return a is not None and b is not None and abs(a - b) <= tolerance * max(1, abs(a))
+    return a == b
+
+def bench_chart(sizes, redraws=200):
+    """MoodChart: инструкций на canvas и время одной перерисовки при ресайзе"""
+    from mindwell import MoodChart
+    results = {}
+    for size in sizes:
+        chart = MoodChart(size=(300, 120))
+        chart.set_data([i % 5 + 1 for i in range(size)], cache_key=size)
+        before = len(chart.canvas.children)
+        start = time.perf_counter()
+        for i in range(redraws):
+            chart.size = (300 + i % 50, 120)
+        redraw_time = (time.perf_counter() - start) / redraws
+        # Поворот экрана: две ширины по очереди берутся из кэша прореживания
+        start = time.perf_counter()
+        for i in range(redraws):
+            chart.size = (300, 120) if i % 2 else (600, 120)
+        rotate_time = (time.perf_counter() - start) / redraws
+        if len(chart._lod_cache) > chart.LOD_CACHE_SIZE:
+            raise AssertionError(f'{len(chart._lod_cache)} widths cached, limit {chart.LOD_CACHE_SIZE}')
+        results[size] = {
+            'instructions': len(chart.canvas.children),
+            'instructions_growth': len(chart.canvas.children) - before,
+            'redraw_us': redraw_time * 1e6,
+            'rotate_us': rotate_time * 1e6,
+        }
+    return results
+
+def make_app(data_dir):
+    """MindWellApp с данными во временном каталоге"""
+    from mindwell import MindWellApp
+
+    class BenchApp(MindWellApp):
+        @property
+        def user_data_dir(self):
+            return data_dir
+
+    return BenchApp()
+
+def bench_startup(repeats=5):
+    """Холодный старт: build() с ленивыми экранами и с построением всех экранов"""
+    lazy, eager = [], []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as tmp:
+            app = make_app(tmp)
+            build_time, root = timed(app.build)
+            lazy.append(build_time)
+            rest_time, _ = timed(lambda: [root.get_screen(name) for name in list(root.factories)])
+            eager.append(build_time + rest_time)
+            app.on_stop()
+    return {'build': {
+        'lazy_ms': min(lazy) * 1e3,
+        'all_screens_ms': min(eager) * 1e3,
+    }}
+
+def bench_cold_start(budget_ms, repeats=3):
+    """Холодный старт в отдельном процессе до первого кадра (MINDWELL_PROFILE=exit)
+
+    По умолчанию используется mock-бэкенд GL, чтобы замер не зависел от дисплея.
+    """
+    env = dict(os.environ, MINDWELL_PROFILE='exit', KIVY_NO_ARGS='1', KIVY_NO_CONSOLELOG='1')
+    env.setdefault('KIVY_GL_BACKEND', 'mock')
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mindwell.py')
+    runs = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as tmp:
+            env['HOME'] = tmp  # чистый user_data_dir на каждый запуск
+            os.makedirs(os.path.join(tmp, '.config'))
+            proc = subprocess.run(
+                [sys.executable, script], env=env, capture_output=True, text=True, timeout=120
+            )
+        lines = [line for line in proc.stderr.splitlines() if line.startswith('mindwell-startup ')]
+        if not lines:
+            raise RuntimeError('cold start run produced no report:\n' + proc.stderr[-2000:])
+        runs.append(json.loads(lines[-1].split(' ', 1)[1]))
+    best = min(runs, key=lambda run: run['first_frame_ms'])
+    if best['first_frame_ms'] > budget_ms:
+        raise AssertionError(
+            f"cold start {best['first_frame_ms']:.0f} ms exceeds budget {budget_ms:.0f} ms"
+        )
+    return {'cold': dict(best, budget_ms=budget_ms)}
+
+class StaleTouch:
+    """Касание, опрошенное age секунд назад (touch_time читает только time_start)"""
+    def __init__(self, age):
+        self.time_start = time.time() - age
+
+def bench_concentration(rounds=10000):
+    """Игра на концентрацию: инструкций на canvas круга не прибавляется, фальстарт не засчитывается"""
+    from kivy.core.window import Window
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        screen = root.get_screen('concentration')
+        canvas = screen.game_circle.canvas
+        before = len(canvas.children)
+        screen.start_game(None)
+        start = time.perf_counter()
+        for i in range(rounds):
+            screen.make_circle_green(0)
+            screen.on_green_presented(Window)
+            if i % 4:
+                screen.register_hit()
+            else:
+                screen.make_circle_red(0)  # промах по таймауту
+            screen.schedule_green_circle()
+        round_time = (time.perf_counter() - start) / rounds
+        screen.stop_game()
+        after = len(canvas.children)
+
+        # Фальстарт: касание до показа зелёного кадра и касание раньше этого кадра
+        screen.start_game(None)
+        log = app.data_manager.concentration_log
+        expected = (screen.score, screen.session_stats.count, log.best, app.data_manager.revision)
+        screen.make_circle_green(0)
+        early = screen.register_hit(StaleTouch(0.008))
+        screen.on_green_presented(Window)
+        stale = screen.register_hit(StaleTouch(0.008))
+        got = (screen.score, screen.session_stats.count, log.best, app.data_manager.revision)
+        screen.stop_game()
+        app.on_stop()
+    if after != before:
+        raise AssertionError(f'circle canvas grew from {before} to {after} instructions')
+    if early or stale or got != expected:
+        raise AssertionError(f'false start scored: {expected} -> {got}')
+    return {rounds: {'instructions': after, 'round_us': round_time * 1e6}}
+
+def bench_meditation(cycles=200):
+    """Медитация: живые события Clock после start/stop и пересчёт фазы после часа сессии"""
+    from kivy.clock import Clock
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        screen = root.get_screen('meditation')
+        baseline = len(Clock.get_events())
+        start = time.perf_counter()
+        for _ in range(cycles):
+            screen.start_meditation()
+            live = len(Clock.get_events()) - baseline
+            if live > 2:  # драйвер сессии и тик единственной анимации круга
+                raise AssertionError(f'{live} clock events while meditating, expected at most 2')
+            screen.stop_meditation()
+        cycle_time = (time.perf_counter() - start) / cycles
+        leaked = len(Clock.get_events()) - baseline
+
+        # Час спустя фаза и таймер берутся из прошедшего времени, без накопленной ошибки
+        screen.start_meditation()
+        screen.session_start -= 3600
+        screen.drive_session(0)
+        timer_text, phase = screen.session_timer.text, screen.breath_phase
+        screen.meditation_active = False
+        screen.stop_meditation()
+        app.on_stop()
+    if leaked:
+        raise AssertionError(f'{leaked} clock events left after {cycles} start/stop cycles')
+    if timer_text != '60:00' or phase != 0:  # 3600 % 14 = 2 с — фаза вдоха
+        raise AssertionError(f'driver drifted: {timer_text}, phase {phase}')
+    return {cycles: {'leaked_events': leaked, 'start_stop_us': cycle_time * 1e6}}
+
+def bench_meditation_log(sizes=(1000, 10000, 100000), queries=1000):
+    """Журнал медитаций: добавление, перестройка при старте и запросы против SQL по таблице"""
+    import datetime
+    from mindwell import MeditationLog
+    results = {}
+    for size in sizes:
+        rng = random.Random(size)
+        ts, rows = 1_600_000_000.0, []
+        for _ in range(size):
+            ts += rng.choice((0.3, 1, 1, 1, 2, 5)) * DAY
+            rows.append((ts, rng.uniform(60, 3600), rng.randint(0, 200)))
+        manager = DataManager()
+        start = time.perf_counter()
+        for row in rows:
+            manager.add_meditation_session(*row)
+        add_time = (time.perf_counter() - start) / size
+        log = manager.meditation_log
+        rebuilt = MeditationLog()
+        rebuild_time, _ = timed(rebuilt.rebuild, manager.storage.iter_meditations())
+
+        days = [datetime.date.fromtimestamp(rng.choice(rows)[0]) for _ in range(queries)]
+        start = time.perf_counter()
+        for day in days:
+            log.minutes_on(day)
+            log.minutes_in_week(day)
+            log.current_streak(day)
+        query_time = (time.perf_counter() - start) / queries
+
+        conn = manager.storage.conn
+        start = time.perf_counter()
+        for day in days[:50]:
+            conn.execute(
+                "SELECT SUM(duration) FROM meditation"
+                " WHERE date(start_ts, 'unixepoch', 'localtime') = ?", (day.isoformat(),)
+            ).fetchone()
+        sql_time = (time.perf_counter() - start) / 50
+
+        expected_days = dict(conn.execute(
+            "SELECT date(start_ts, 'unixepoch', 'localtime'), SUM(duration) FROM meditation GROUP BY 1"
+        ).fetchall())
+        longest = conn.execute('SELECT MAX(duration) FROM meditation').fetchone()[0]
+        manager.close()
+        actual_days = {day.isoformat(): seconds for day, seconds in log.day_seconds.items()}
+        if (actual_days.keys() != expected_days.keys()
+                or any(abs(actual_days[d] - expected_days[d]) > 1e-6 for d in expected_days)
+                or log.longest[0] != longest or rebuilt.__dict__ != log.__dict__):
+            raise AssertionError(f'meditation log diverges from the table at {size} sessions')
+        results[size] = {
+            'add_us': add_time * 1e6,
+            'rebuild_ms': rebuild_time * 1e3,
+            'query_us': query_time * 1e6,
+            'sql_scan_us': sql_time * 1e6,
+            'longest_run': log.longest_run,
+        }
+    return results
+
+def bench_concentration_log(sizes=(10000, 100000, 1000000), reads=1000):
+    """Попытки игры: add() в журнал, загрузка итогов при старте, чтения рекордов против сортировки"""
+    import datetime
+    from mindwell import ConcentrationLog
+    results = {}
+    for size in sizes:
+        rng = random.Random(size)
+        ts, session_ts, rows = 1_600_000_000.0, 0.0, []
+        for i in range(size):
+            if i % 50 == 0:
+                ts += rng.uniform(0, DAY)
+                session_ts = ts
+            ts += rng.uniform(2, 6)
+            rows.append((session_ts, ts, None if rng.random() < 0.1 else rng.uniform(150, 900)))
+        storage = SQLiteStorage()
+        log = ConcentrationLog()
+        start = time.perf_counter()
+        for row in rows:
+            log.add(*row)
+        add_time = (time.perf_counter() - start) / size
+        storage.conn.executemany('INSERT INTO trial (session_ts, ts, reaction_ms) VALUES (?, ?, ?)', rows)
+        rebuild_time, _ = timed(
+            storage.execute_batch, [(sql, [()]) for sql in SQLiteStorage.REBUILD_TRIAL_TOTALS]
+        )
+        loaded = ConcentrationLog()
+        load_time, _ = timed(loaded.load, storage)
+
+        days = [datetime.date.fromtimestamp(rng.choice(rows)[1]) for _ in range(reads)]
+        start = time.perf_counter()
+        for day in days:
+            log.personal_bests()
+            log.day_stats(day)
+        read_time = (time.perf_counter() - start) / reads
+        scan_time, expected = timed(
+            lambda: sorted((r, t) for _, t, r in rows if r is not None)[:log.k]
+        )
+        storage.close()
+        if log.personal_bests() != expected or loaded.personal_bests() != expected:
+            raise AssertionError(f'personal bests diverge at {size} trials')
+        for table in ('days', 'sessions'):
+            mine, theirs = getattr(log, table), getattr(loaded, table)
+            if mine.keys() != theirs.keys() or any(
+                mine[k][0] != theirs[k][0] or mine[k][2:] != theirs[k][2:]
+                or abs(mine[k][1] - theirs[k][1]) > 1e-6 for k in mine
+            ):
+                raise AssertionError(f'{table} totals diverge from SQL at {size} trials')
+        results[size] = {
+            'add_us': add_time * 1e6,
+            'rebuild_totals_ms': rebuild_time * 1e3,
+            'load_ms': load_time * 1e3,
+            'read_us': read_time * 1e6,
+            'sort_scan_ms': scan_time * 1e3,
+        }
+    return results
+
+def bench_language_switch(switches=60):
+    """Смена языка при построенных пяти экранах: число привязок и время переключения"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        for name in list(root.factories):
+            root.get_screen(name)
+        languages = ['ru', 'zh', 'en']
+        start = time.perf_counter()
+        for i in range(switches):
+            app.lang_manager.set_language(languages[i % len(languages)])
+        switch_time = (time.perf_counter() - start) / switches
+        bindings = len(app.lang_manager.bindings)
+        app.on_stop()
+    return {'switch': {'bindings': bindings, 'switch_us': switch_time * 1e6}}
+
+def bench_catalogs(language_counts=(3, 13, 50), repeats=20):
+    """Старт LanguageManager (JSON и marshal-кэш) и память при росте числа языков"""
+    import shutil
+    from mindwell import LanguageManager
+    results = {}
+    for count in language_counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            locales, cache = os.path.join(tmp, 'locales'), os.path.join(tmp, 'cache')
+            os.makedirs(locales)
+            os.makedirs(cache)
+            index = {}
+            for i in range(count):
+                code = 'en' if i == 0 else f'x{i}'
+                shutil.copy(os.path.join(LanguageManager.LOCALES_DIR, 'en.json'),
+                            os.path.join(locales, f'{code}.json'))
+                index[code] = code
+            with open(os.path.join(locales, 'index.json'), 'w') as f:
+                json.dump(index, f)
+
+            cold_time, _ = timed(LanguageManager, 'en', locales, cache)
+            start = time.perf_counter()
+            for _ in range(repeats):
+                LanguageManager('en', locales, cache)
+            warm_time = (time.perf_counter() - start) / repeats
+            memory = measure_memory(lambda: LanguageManager('en', locales, cache))
+            switch_time, _ = timed(LanguageManager('en', locales, cache).set_language, 'x1')
+        results[count] = {
+            'json_init_us': cold_time * 1e6,
+            'marshal_init_us': warm_time * 1e6,
+            'resident_kb': memory / 1024,
+            'first_switch_us': switch_time * 1e6,
+        }
+    # Без каталогов (например, их не упаковали в APK) показываются ключи, а не падение
+    with tempfile.TemporaryDirectory() as tmp:
+        missing = LanguageManager('en', tmp)
+        if missing.get_text('settings') != 'settings' or missing.available_languages():
+            raise AssertionError('missing catalogs are not handled')
+    return results
+
+def attach_to_window(app, root):
+    """Показать дерево приложения в окне, чтобы кадры реально рисовались"""
+    from kivy.base import EventLoop
+    from kivy.core.window import Window
+    EventLoop.ensure_window()
+    for child in list(Window.children):
+        Window.remove_widget(child)
+    app.root = root
+    Window.add_widget(root)
+    return Window
+
+def run_frames(count, before_frame=None):
+    """Прогнать count кадров через EventLoop.idle(); время каждого кадра, мс"""
+    from kivy.base import EventLoop
+    frame_times = []
+    for i in range(count):
+        start = time.perf_counter()
+        if before_frame:
+            before_frame(i)
+        EventLoop.idle()
+        frame_times.append((time.perf_counter() - start) * 1e3)
+    return frame_times
+
+def settle(root, frames=5):
+    """Дождаться конца перехода между экранами и дорисовать несколько кадров"""
+    from kivy.base import EventLoop
+    while root.transition.is_active:
+        EventLoop.idle()
+    run_frames(frames)
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def bench_slider_drag(frames=120, events_per_frame=8):
+    """Перетаскивание слайдера настроения: несколько событий value на кадр"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        root.current = 'mood'
+        screen = root.get_screen('mood')
+        settle(root)
+
+        def drag(frame):
+            for k in range(events_per_frame):
+                screen.mood_slider.value = 1 + (frame * events_per_frame + k) % 5
+
+        frame_times = run_frames(frames, drag)
+        app.on_stop()
+    return {'drag': {
+        'frame_ms_median': percentile(frame_times, 0.5),
+        'frame_ms_p90': percentile(frame_times, 0.9),
+        'frame_ms_max': max(frame_times),
+    }}
+
+def bench_layout(passes=60):
+    """MainScreen: число инструкций и время прохода раскладки с отрисовкой при ресайзе"""
+    from kivy.base import EventLoop
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        window = attach_to_window(app, root)
+        settle(root)
+        screen = root.get_screen('main')
+        width, height = window.size
+        root.size_hint = (None, None)  # иначе окно возвращает корню свой размер
+        pass_times = []
+        for i in range(passes):
+            start = time.perf_counter()
+            root.size = (width - (i % 2) * 40, height)
+            EventLoop.idle()
+            pass_times.append((time.perf_counter() - start) * 1e3)
+        instructions = count_instructions(screen)
+        app.on_stop()
+    return {'main': {
+        'instructions': instructions,
+        'layout_ms_median': percentile(pass_times, 0.5),
+        'layout_ms_p90': percentile(pass_times, 0.9),
+    }}
+
+SCREENS = ('mood', 'meditation', 'concentration', 'ei')
+
+def bench_transitions(repeats=3):
+    """Переход main -> экран -> main: первый (с построением экрана) и повторные"""
+    from kivy.base import EventLoop
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        settle(root)
+
+        def transition(name):
+            """Время до первого кадра после смены экрана и кадры самой анимации, мс"""
+            start = time.perf_counter()
+            app.router.go(name)
+            EventLoop.idle()
+            switch = (time.perf_counter() - start) * 1e3
+            frames = []
+            while root.transition.is_active:
+                frame_start = time.perf_counter()
+                EventLoop.idle()
+                frames.append((time.perf_counter() - frame_start) * 1e3)
+            return switch, frames
+
+        for name in SCREENS:
+            first, _ = transition(name)
+            transition('main')
+            warm, frames = [], []
+            for _ in range(repeats):
+                switch, animation = transition(name)
+                warm.append(switch)
+                frames.extend(animation)
+                transition('main')
+            results[name] = {
+                'first_switch_ms': first,
+                'build_ms': root.build_times.get(name, 0) * 1e3,
+                'switch_ms': min(warm),
+                'frame_ms_median': percentile(frames, 0.5),
+                'frame_ms_p90': percentile(frames, 0.9),
+            }
+        app.on_stop()
+    return results
+
+def bench_prewarm(baseline_frames=30, hold_frames=10, max_frames=600):
+    """Предпрогрев экранов: ждёт конца перехода и касания, рывок кадра при построении"""
+    from kivy.base import EventLoop
+    from kivy.tests.common import UnitTestTouch
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        settle(root)
+
+        def paced(frame):
+            time.sleep(1 / 60)  # темп 60 Гц, как у дисплея
+
+        baseline = run_frames(baseline_frames, paced)
+        app.router.go('mood')
+        root.prewarm(SCREENS, delay=0)
+        touch = UnitTestTouch(5, 5)
+        touch.touch_down()
+        while root.transition.is_active:
+            run_frames(1, paced)
+        run_frames(hold_frames, paced)
+        built_while_busy = [name for name in SCREENS if name not in root.factories and name != 'mood']
+        touch.touch_up()
+        app.router.back()
+        build_frames, other_frames = [], []
+        while root.factories and len(build_frames) + len(other_frames) < max_frames:
+            pending = len(root.factories)
+            frame = run_frames(1, paced)
+            (build_frames if len(root.factories) < pending else other_frames).extend(frame)
+        left = sorted(root.factories)
+        deferred = dict(root.prewarm_deferred)
+        app.on_stop()
+    if built_while_busy or left:
+        raise AssertionError(f'built during transition/touch: {built_while_busy}, never built: {left}')
+    return {'prewarm': {
+        'baseline_frame_ms_median': percentile(baseline, 0.5),
+        'build_frame_ms_max': max(build_frames),
+        'other_frame_ms_median': percentile(other_frames, 0.5) if other_frames else 0.0,
+        'ei_build_ms': root.build_times['ei'] * 1e3,
+        'frames_to_warm': len(build_frames) + len(other_frames),
+        'deferred_s_max': max(deferred.values()),
+    }}
+
+def bench_router(round_trips=3):
+    """Роутер: число объектов переходов, «Назад», кадры по уровням и понижение уровня"""
+    from kivy.base import EventLoop
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        settle(root)
+        router = app.router
+        transitions = set()
+        for level, kind in enumerate(router.LEVELS):
+            router.level = level
+            frames = []
+            for _ in range(round_trips):
+                for step in (lambda: router.go('mood'), router.back):
+                    step()
+                    transitions.add(id(root.transition))
+                    EventLoop.idle()
+                    # Темп 60 Гц, как у дисплея
+                    while root.transition.is_active:
+                        time.sleep(1 / 60)
+                        frame_start = time.perf_counter()
+                        EventLoop.idle()
+                        frames.append((time.perf_counter() - frame_start) * 1e3)
+            results[kind] = {
+                'frames_per_trip': len(frames) / round_trips,
+                'frame_ms_median': percentile(frames, 0.5) if frames else 0.0,
+                'frame_ms_p90': percentile(frames, 0.9) if frames else 0.0,
+            }
+        if len(transitions) > len(router.transitions):
+            raise AssertionError(f'{len(transitions)} transition objects for {len(router.transitions)} kinds')
+
+        # Кнопка «Назад» проходит через go_back экрана и стек
+        router.level = 0
+        router.go('meditation')
+        settle(root)
+        screen = root.get_screen('meditation')
+        screen.start_meditation()
+        EventLoop.window.dispatch('on_keyboard', router.KEY_BACK, 0, None, [])
+        settle(root)
+        if root.current != 'main' or screen.meditation_active or router.stack:
+            raise AssertionError('back key did not stop meditation and return home')
+
+        # «Назад» посреди слайда: экран не должен пропасть
+        router.go('mood')
+        EventLoop.idle()
+        EventLoop.window.dispatch('on_keyboard', router.KEY_BACK, 0, None, [])
+        settle(root)
+        if root.current != 'main' or root.children != [root.current_screen]:
+            raise AssertionError(f'interrupted back left {root.current} showing {root.children}')
+
+        # Медленное устройство: каждый переход дороже бюджета
+        router.FRAME_BUDGET_MS = 0.0
+        levels = []
+        for _ in range(router.SLOW_STREAK * 2):
+            router.go('mood')
+            settle(root)
+            router.back()
+            settle(root)
+            levels.append(router.LEVELS[router.level])
+        app.on_stop()
+        restarted = make_app(tmp)
+        restarted.build()
+        saved = restarted.router.LEVELS[restarted.router.level]
+        restarted.on_stop()
+    if levels[-1] != 'none' or saved != 'none':
+        raise AssertionError(f'slow device did not fall back: {levels}, saved {saved}')
+    results['slow device'] = {
+        'fade_after_transitions': 2 * (levels.index('fade') + 1),
+        'none_after_transitions': 2 * (levels.index('none') + 1),
+    }
+    return results
+
+def bench_tip_flip(flips=50, cold_flips=10):
+    """Экран советов: next_tip() и первый кадр с новым советом, с заранее свёрстанными
+    соседями и со сброшенным кэшем вёрстки"""
+    from kivy.base import EventLoop
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        root.current = 'ei'
+        screen = root.get_screen('ei')
+        settle(root)
+
+        def idle():
+            # Свободные кадры с темпом 60 Гц, как между нажатиями: вёрстка соседей
+            while screen.prefetch_event.is_triggered:
+                time.sleep(1 / 60)
+                EventLoop.idle()
+
+        in_flip = []
+
+        def flip():
+            misses = screen.layout_misses
+            start = time.perf_counter()
+            screen.next_tip(None)
+            EventLoop.idle()
+            elapsed = (time.perf_counter() - start) * 1e3
+            in_flip.append(screen.layout_misses - misses)
+            idle()
+            return elapsed
+
+        idle()
+        flip_times = [flip() for _ in range(flips)]
+        misses = sum(in_flip)
+        cold_times = []
+        for _ in range(cold_flips):
+            screen.layouts.clear()
+            cold_times.append(flip())
+        app.on_stop()
+    # Соседей верстают свободные кадры, само перелистывание не верстает ничего
+    if misses:
+        raise AssertionError(f'{misses} layouts rendered while flipping')
+    return {'flip': {
+        'flip_ms_median': percentile(flip_times, 0.5),
+        'flip_ms_p90': percentile(flip_times, 0.9),
+        'flip_ms_max': max(flip_times),
+        'uncached_ms_median': percentile(cold_times, 0.5),
+        'layouts_in_flips': misses,
+    }}
+
+def write_tip_pack(path, count):
+    """Пакет из count советов по пяти категориям"""
+    categories = ['self_awareness', 'empathy', 'regulation', 'social_skills', 'motivation']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({
+                'category': categories[i % len(categories)],
+                'title': f'Tip {i}',
+                'content': f'Practice number {i}: ' + 'notice, name and accept the feeling. ' * 4,
+                'science': f'Study {i} links this habit to better emotional regulation.',
+            }) + '\n')
+
+def bench_tip_library(sizes=(1000, 10000, 100000), flips=1000):
+    """Пакеты советов: индекс (скан и marshal-кэш), память против загрузки целиком, листание"""
+    from mindwell import TipLibrary
+    results = {}
+    for count in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            packs, cache = os.path.join(tmp, 'tips'), os.path.join(tmp, 'cache')
+            path = os.path.join(packs, 'en', 'bulk.jsonl')
+            write_tip_pack(path, count)
+            scan_time, _ = timed(TipLibrary, 'en', [packs], cache)
+            cached_time, library = timed(TipLibrary, 'en', [packs], cache)
+            with open(path, encoding='utf-8') as f:
+                everything = [json.loads(line) for line in f]
+            for index in range(0, count, max(1, count // 50)):
+                if library.get(index) != everything[index]:
+                    raise AssertionError(f'tip {index} differs from the pack')
+            library.select('empathy')
+            if library.get(3) != everything[3 * 5 + 1]:
+                raise AssertionError('category view returns wrong tip')
+            library.select(None)
+
+            def flip_all():
+                for i in range(flips):
+                    library.get(i % count)
+                    library.prefetch(i % count)
+
+            flip_time, _ = timed(flip_all)
+            if len(library.pages) > 2:
+                raise AssertionError(f'{len(library.pages)} pages resident')
+            paged = measure_memory(lambda: (lambda lib: (lib.prefetch(0), lib))(
+                TipLibrary('en', [packs], cache)))
+
+            def load_everything():
+                with open(path, encoding='utf-8') as f:
+                    return [json.loads(line) for line in f]
+
+            eager = measure_memory(load_everything)
+            screen_times = []
+            for _ in range(2):  # первый раз индекс сканируется, второй — из кэша
+                app = make_app(tmp)
+                root = app.build()
+                root.get_screen('ei').prefetch_event.cancel()  # каталог пакетов сейчас удалится
+                screen_times.append(root.build_times['ei'])
+                app.on_stop()
+        results[count] = {
+            'scan_index_ms': scan_time * 1e3,
+            'cached_index_ms': cached_time * 1e3,
+            'flip_us': flip_time / flips * 1e6,
+            'paged_kb': paged / 1024,
+            'all_in_memory_kb': eager / 1024,
+            'screen_scan_ms': screen_times[0] * 1e3,
+            'screen_cached_ms': screen_times[1] * 1e3,
+        }
+    return results
+
+def bench_instrumentation(frames=200):
+    """Перетаскивание слайдера без замеров и с замерами, отладочной панелью и JSON-отчётом"""
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(tmp)
+        root = app.build()
+        attach_to_window(app, root)
+        root.current = 'mood'
+        screen = root.get_screen('mood')
+        settle(root)
+
+        def drag(frame):
+            screen.mood_slider.value = 1 + frame % 5
+
+        disabled = run_frames(frames, drag)
+        app.instrumentation.enable()
+        run_frames(5, drag)  # первая отрисовка панели
+        enabled = run_frames(frames, drag)
+        report = app.instrumentation.report()
+        path = app.instrumentation.dump()
+        with open(path) as f:
+            dumped = json.load(f)
+        app.instrumentation.disable()
+        app.on_stop()
+    stats = report['screens'].get('mood', {})
+    if stats.get('frames', 0) < frames or dumped['screens'].keys() != report['screens'].keys():
+        raise AssertionError(f'instrumentation lost frames: {stats}')
+    return {'mood': {
+        'off_frame_ms_median': percentile(disabled, 0.5),
+        'on_frame_ms_median': percentile(enabled, 0.5),
+        'recorded_frames': stats['frames'],
+        'recorded_ms_p90': stats['frame_ms_p90'],
+        'clock_events': stats['clock_events'],
+        'animations': stats['animations'],
+        'instructions': stats['instructions'],
+    }}
+
+def print_table(title, results):
+    print(title)
+    for size, row in results.items():
+        cells = '  '.join(f'{key}={value:.3f}' for key, value in row.items())
+        print(f'  {size:>9}: {cells}')
+
+def environment():
+    """Метаданные прогона для сравнения отчётов между коммитами"""
+    import kivy
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return {
+        'commit': commit,
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'kivy': kivy.__version__,
+        'platform': platform.platform(),
+        'gl_backend': os.environ.get('KIVY_GL_BACKEND', ''),
+        'video_driver': os.environ.get('SDL_VIDEODRIVER', ''),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='MindWell benchmarks')
+    parser.add_argument('--sizes', default='10000,100000,1000000')
+    parser.add_argument('--startup-budget-ms', type=float, default=1500)
+    parser.add_argument('--only', default='', help='бенчмарки через запятую')
+    parser.add_argument('--json', default='', help='записать результаты в JSON-файл')
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(',')]
+    benches = [
+        ('storage', lambda: bench_storage(sizes)),
+        ('write behind', bench_write_behind),
+        ('writer failures', bench_writer_failures),
+        ('transfer', lambda: bench_transfer(sizes)),
+        ('settings import', bench_settings_import),
+        ('analytics', lambda: bench_analytics(sizes)),
+        ('memory', lambda: bench_memory(sizes)),
+        ('rollups', lambda: bench_rollups(sizes)),
+        ('startup', bench_startup),
+        ('cold start', lambda: bench_cold_start(args.startup_budget_ms)),
+        ('concentration', bench_concentration),
+        ('meditation', bench_meditation),
+        ('meditation log', bench_meditation_log),
+        ('concentration log', bench_concentration_log),
+        ('catalogs', bench_catalogs),
+        ('language', bench_language_switch),
+        ('slider', bench_slider_drag),
+        ('layout', bench_layout),
+        ('transitions', bench_transitions),
+        ('router', bench_router),
+        ('prewarm', bench_prewarm),
+        ('tip flip', bench_tip_flip),
+        ('tip library', bench_tip_library),
+        ('instrumentation', bench_instrumentation),
+        ('chart', lambda: bench_chart([7, 30, 365, 5 * 365] + sizes)),
+    ]
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    unknown = only - {name for name, _ in benches}
+    if unknown:
+        parser.error('unknown benchmarks: ' + ', '.join(sorted(unknown)))
+    report = {'environment': environment(), 'results': {}}
+    for name, bench in benches:
+        if only and name not in only:
+            continue
+        results = bench()
+        print_table(name, results)
+        report['results'][name] = {str(size): row for size, row in results.items()}
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+if __name__ == '__main__':
+    main()
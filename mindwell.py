@@ -4,32 +4,197 @@ MindWell - Современное мобильное приложение для
 Включает трекер настроения, медитацию, концентрацию и эмоциональный интеллект
 """
 
+import builtins
+import json
+import bisect
+import marshal
+import datetime
+import heapq
+import os
+import queue
+import random
+import math
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from array import array
+
+STARTUP_T0 = time.perf_counter()
+# MINDWELL_PROFILE=1 — отчёт о старте; MINDWELL_PROFILE=exit — отчёт и выход после первого кадра
+PROFILE_STARTUP = os.environ.get('MINDWELL_PROFILE', '')
+
+class ImportProfiler:
+    """Замер стоимости импортов при старте (аналог python -X importtime)"""
+    def __init__(self):
+        self.records = []  # (модуль, собственное время, суммарное время, глубина)
+        self._children = []
+        self._original = None
+
+    def install(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        if level or name in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+        self._children.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._children.pop()
+            if self._children:
+                self._children[-1] += elapsed
+            self.records.append((name, elapsed - nested, elapsed, len(self._children)))
+
+    def report(self, limit=25, stream=None):
+        """Самые дорогие импорты в формате -X importtime"""
+        stream = stream or sys.__stderr__  # Kivy подменяет sys.stderr своим логгером
+        print('import time: self [us] | cumulative | imported package', file=stream)
+        for name, own, total, depth in sorted(self.records, key=lambda r: -r[2])[:limit]:
+            print(f'import time: {own * 1e6:9.0f} | {total * 1e6:10.0f} | {"  " * depth}{name}', file=stream)
+
+import_profiler = ImportProfiler() if PROFILE_STARTUP else None
+if import_profiler:
+    import_profiler.install()
+
 from kivy.app import App
-from kivy.uix.screenmanager import ScreenManager, Screen, SlideTransition
+from kivy.uix.screenmanager import (
+    ScreenManager, Screen, SlideTransition, FadeTransition, NoTransition
+)
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
 from kivy.uix.button import Button
-from kivy.uix.slider import Slider
-from kivy.uix.progressbar import ProgressBar
-from kivy.uix.popup import Popup
-from kivy.uix.scrollview import ScrollView
 from kivy.clock import Clock
 from kivy.animation import Animation
-from kivy.graphics import Color, RoundedRectangle, Line, Ellipse
+from kivy.graphics import (
+    Color, RoundedRectangle, Line, Ellipse, Mesh, Rectangle, PushMatrix, PopMatrix, Scale
+)
+from kivy.core.text import Label as CoreLabel
 from kivy.uix.widget import Widget
-from kivy.metrics import dp
-import json
-import datetime
-import random
-import math
+from kivy.metrics import dp, sp
+# Popup, Slider и ScrollView нужны только вторичным экранам
+# и импортируются по месту использования
+
+def corner_offsets(segments):
+    """Единичные дуги четырёх углов (против часовой стрелки от правого верхнего)"""
+    return [
+        [
+            (math.cos(math.radians(start + 90 * k / segments)),
+             math.sin(math.radians(start + 90 * k / segments)))
+            for k in range(segments + 1)
+        ]
+        for start in (0, 90, 180, 270)
+    ]
+
+CORNER_OFFSETS = corner_offsets(6)
+
+class BackgroundRenderer:
+    """Общий рендерер фонов экрана
+
+    Фон экрана, карточки и кнопки рисуются одним мешем на стиль в
+    canvas.before экрана. pos/size зарегистрированных виджетов привязаны к
+    одному триггеру Clock, поэтому геометрия пересчитывается один раз за
+    проход раскладки, а не колбэком в каждом виджете. Виджеты должны лежать
+    в системе координат экрана (без вложенных RelativeLayout/ScrollView).
+    """
+    # стиль -> (цвет, радиус скругления); порядок словаря — порядок отрисовки
+    STYLES = {
+        'screen': ((0.05, 0.05, 0.1, 1), 0),      # Тёмно-синий фон
+        'panel': ((0.15, 0.15, 0.25, 0.8), 20),   # Полупрозрачный фон
+        'button': ((0.1, 0.1, 0.15, 1), 15),      # Тёмный фон
+    }
+    def __init__(self, owner):
+        self.owner = owner
+        self.widgets = {style: [] for style in self.STYLES}
+        self.rects = {style: None for style in self.STYLES}  # последняя нарисованная геометрия
+        self.meshes = {}
+        with owner.canvas.before:
+            for style, (color, radius) in self.STYLES.items():
+                Color(*color)
+                self.meshes[style] = Mesh(mode='triangles')
+        self.trigger = Clock.create_trigger(self.update, -1)
+        self.update_count = 0
+        self.update_time = 0.0
+        
+    def add(self, widget, style):
+        self.widgets[style].append(widget)
+        widget.bind(pos=self.trigger, size=self.trigger)
+        self.trigger()
+        
+    def update(self, *args):
+        """Пересчитать меши стилей, у которых изменилась геометрия"""
+        start = time.perf_counter()
+        for style, widgets in self.widgets.items():
+            # Экран — RelativeLayout: его собственный фон рисуется в локальных (0, 0)
+            rects = [
+                (0, 0, widget.width, widget.height) if widget is self.owner
+                else (widget.x, widget.y, widget.width, widget.height)
+                for widget in widgets
+            ]
+            # Вложенные раскладки дозавершаются в том же кадре — промежуточные
+            # вызовы без изменений ничего не перестраивают
+            if rects == self.rects[style]:
+                continue
+            self.rects[style] = rects
+            radius = self.STYLES[style][1]
+            vertices, indices = [], []
+            for x, y, width, height in rects:
+                self.add_rounded_rect(vertices, indices, x, y, width, height, radius)
+            mesh = self.meshes[style]
+            mesh.vertices = vertices
+            mesh.indices = indices
+        self.update_count += 1
+        self.update_time += time.perf_counter() - start
+        
+    @classmethod
+    def add_rounded_rect(cls, vertices, indices, x, y, width, height, radius):
+        """Скруглённый прямоугольник веером треугольников из центра"""
+        radius = min(radius, width / 2, height / 2)
+        base = len(vertices) // 4
+        vertices.extend((x + width / 2, y + height / 2, 0, 0))
+        if radius > 0:
+            right, top = x + width - radius, y + height - radius
+            left, bottom = x + radius, y + radius
+            for cx, cy, offsets in (
+                (right, top, CORNER_OFFSETS[0]),
+                (left, top, CORNER_OFFSETS[1]),
+                (left, bottom, CORNER_OFFSETS[2]),
+                (right, bottom, CORNER_OFFSETS[3]),
+            ):
+                for dx, dy in offsets:
+                    vertices.extend((cx + radius * dx, cy + radius * dy, 0, 0))
+        else:
+            vertices.extend((
+                x + width, y + height, 0, 0, x, y + height, 0, 0,
+                x, y, 0, 0, x + width, y, 0, 0,
+            ))
+        count = len(vertices) // 4 - base - 1
+        for k in range(count):
+            indices.extend((base, base + 1 + k, base + 1 + (k + 1) % count))
 
 class NeumorphicButton(Button):
-    """Кнопка с neumorphism эффектом"""
-    def __init__(self, **kwargs):
+    """Кнопка с neumorphism эффектом
+
+    С renderer фон рисует общий BackgroundRenderer экрана; без него
+    (например, во всплывающих окнах) кнопка рисует фон сама.
+    """
+    def __init__(self, renderer=None, **kwargs):
         super().__init__(**kwargs)
         self.background_normal = ''
         self.background_color = [0, 0, 0, 0]
+        if renderer is not None:
+            renderer.add(self, 'button')
+            return
         with self.canvas.before:
             Color(0.1, 0.1, 0.15, 1)  # Тёмный фон
             self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size, radius=[15])
@@ -40,9 +205,12 @@ class NeumorphicButton(Button):
         self.bg_rect.size = self.size
 
 class GlassmorphicPanel(Widget):
-    """Панель с glassmorphism эффектом"""
-    def __init__(self, **kwargs):
+    """Панель с glassmorphism эффектом (фон — через renderer, если он задан)"""
+    def __init__(self, renderer=None, **kwargs):
         super().__init__(**kwargs)
+        if renderer is not None:
+            renderer.add(self, 'panel')
+            return
         with self.canvas.before:
             Color(0.15, 0.15, 0.25, 0.8)  # Полупрозрачный фон
             self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size, radius=[20])
@@ -52,166 +220,1719 @@ class GlassmorphicPanel(Widget):
         self.bg_rect.pos = self.pos
         self.bg_rect.size = self.size
 
+def unit_circle(segments):
+    """Смещения вершин правильного многоугольника радиуса 1"""
+    step = 2 * math.pi / segments
+    return [(math.cos(k * step), math.sin(k * step)) for k in range(segments)]
+
+def downsample_lttb(values, threshold):
+    """Largest-Triangle-Three-Buckets: до threshold точек [(index, value), ...] с сохранением формы"""
+    count = len(values)
+    if threshold >= count or threshold < 3:
+        return list(enumerate(values))
+    sampled = [(0, values[0])]
+    bucket_size = (count - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        # Среднее следующей корзины — третья вершина треугольника
+        next_start = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, count)
+        avg_x = (next_start + next_end - 1) / 2
+        avg_y = sum(values[next_start:next_end]) / (next_end - next_start)
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        ax, ay = a, values[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (values[j] - ay) - (ax - j) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append((best, values[best]))
+        a = best
+    sampled.append((count - 1, values[-1]))
+    return sampled
+
 class MoodChart(Widget):
-    """Виджет для отображения графика настроения"""
+    """Виджет для отображения графика настроения
+
+    Инструкции canvas создаются один раз; при изменении позиции, размера
+    или данных обновляются только их points/vertices. Длинные ряды
+    прореживаются LTTB до ширины виджета, результат кэшируется по
+    (cache_key, ширина) для LOD_CACHE_SIZE последних ширин.
+    """
+    DOT_RADIUS = 5
+    DOT_SEGMENTS = 12
+    # Единичная окружность для точек-мешей, считается один раз
+    DOT_OFFSETS = unit_circle(DOT_SEGMENTS)
+    # Портрет и ландшафт; при перетаскивании размера окна старые ширины вытесняются
+    LOD_CACHE_SIZE = 2
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.mood_data = [3, 4, 2, 5, 3, 4, 4]  # Примерные данные за неделю
+        self._dot_count = 0
+        self._cache_key = None
+        self._lod_cache = {}  # ширина -> выборка, в порядке последнего использования
+        with self.canvas:
+            # Градиентная линия графика
+            Color(0.4, 0.8, 1, 1)  # Неоновый синий
+            self.line = Line(points=[], width=3, cap='round', joint='round')
+            # Все точки графика — один меш
+            Color(1, 0.4, 0.8, 1)  # Неоновый розовый
+            self.dots = Mesh(vertices=[], indices=[], mode='triangles')
         self.bind(pos=self.update_chart, size=self.update_chart)
-        
+
+    def set_data(self, mood_data, cache_key=None):
+        """Задать ряд; cache_key (например, диапазон и ревизия данных) позволяет переиспользовать прореживание"""
+        if cache_key is None or cache_key != self._cache_key:
+            self._lod_cache = {}
+        self._cache_key = cache_key
+        self.mood_data = list(mood_data)
+        self.update_chart()
+        
+    def visible_samples(self):
+        """Точки ряда, прореженные до ширины виджета в пикселях"""
+        width = int(self.width)
+        samples = self._lod_cache.pop(width, None)
+        if samples is None:
+            samples = downsample_lttb(self.mood_data, width)
+            if len(self._lod_cache) >= self.LOD_CACHE_SIZE:
+                del self._lod_cache[next(iter(self._lod_cache))]
+        self._lod_cache[width] = samples
+        return samples
+        
+    def chart_points(self):
+        """Экранные координаты точек [x0, y0, x1, y1, ...]"""
+        steps = max(len(self.mood_data) - 1, 1)  # одна точка — без деления на ноль
+        x_scale = self.width / steps
+        y_scale = self.height / 5
+        points = []
+        for i, mood in self.visible_samples():
+            points.append(self.x + i * x_scale)
+            points.append(self.y + mood * y_scale)
+        return points
+
     def update_chart(self, *args):
-        self.canvas.clear()
         if self.size[0] == 0 or self.size[1] == 0:
+            self.line.points = []
+            self.dots.vertices = []
             return
             
-        with self.canvas:
-            # Градиентная линия графика
-            Color(0.4, 0.8, 1, 1)  # Неоновый синий
-            points = []
-            for i, mood in enumerate(self.mood_data):
-                x = self.x + (i / (len(self.mood_data) - 1)) * self.width
-                y = self.y + (mood / 5) * self.height
-                points.extend([x, y])
-            
-            if len(points) >= 4:
-                Line(points=points, width=3, cap='round', joint='round')
+        points = self.chart_points()
+        self.line.points = points if len(points) >= 4 else []
+        
+        # Точки рисуем, только пока они не сливаются в полосу
+        radius = self.DOT_RADIUS
+        dot_points = points if len(points) // 2 * radius * 2 <= self.width else []
+        vertices = []
+        for i in range(0, len(dot_points), 2):
+            x, y = dot_points[i], dot_points[i + 1]
+            vertices.extend((x, y, 0, 0))
+            for dx, dy in self.DOT_OFFSETS:
+                vertices.extend((x + dx * radius, y + dy * radius, 0, 0))
                 
-            # Точки на графике
-            Color(1, 0.4, 0.8, 1)  # Неоновый розовый
-            for i, mood in enumerate(self.mood_data):
-                x = self.x + (i / (len(self.mood_data) - 1)) * self.width
-                y = self.y + (mood / 5) * self.height
-                Ellipse(pos=(x-5, y-5), size=(10, 10))
+        # Индексы зависят только от количества точек
+        count = len(dot_points) // 2
+        if count != self._dot_count:
+            self._dot_count = count
+            self.dots.indices = self.dot_indices(count)
+        self.dots.vertices = vertices
+        
+    @classmethod
+    def dot_indices(cls, count):
+        """Треугольники веером для count точек"""
+        segments = cls.DOT_SEGMENTS
+        stride = segments + 1
+        indices = []
+        for dot in range(count):
+            center = dot * stride
+            for k in range(segments):
+                indices.extend((center, center + 1 + k, center + 1 + (k + 1) % segments))
+        return indices
 
-class DataManager:
-    """Менеджер данных для сохранения состояния приложения"""
-    def __init__(self):
-        self.data = {
-            'mood_history': [],
-            'meditation_sessions': 0,
-            'concentration_score': 0,
-            'language': 'en'
-        }
-        
-    def save_mood(self, mood, note=""):
-        entry = {
-            'date': datetime.datetime.now().isoformat(),
-            'mood': mood,
-            'note': note
+class MoodIndicator(Widget):
+    """Эмодзи настроения: текстуры рендерятся один раз, пульс — масштабом, а не font_size"""
+    _textures = {}  # (текст, размер шрифта) -> текстура, общий для всех экземпляров
+    
+    def __init__(self, text='😐', font_size='80sp', **kwargs):
+        super().__init__(**kwargs)
+        self.font_size = sp(float(font_size[:-2])) if isinstance(font_size, str) else font_size
+        with self.canvas:
+            PushMatrix()
+            self.scale = Scale(1, 1, 1)
+            self.color = Color(1, 1, 1, 1)
+            self.rect = Rectangle()
+            PopMatrix()
+        self.bind(pos=self.update_rect, size=self.update_rect)
+        self.show(text, [1, 1, 1, 1])
+        
+    @classmethod
+    def texture_for(cls, text, font_size):
+        key = (text, font_size)
+        texture = cls._textures.get(key)
+        if texture is None:
+            label = CoreLabel(text=text, font_size=font_size)
+            label.refresh()
+            texture = cls._textures[key] = label.texture
+        return texture
+        
+    def show(self, text, color):
+        """Показать эмодзи: только смена текстуры и цвета, без растеризации"""
+        self.rect.texture = self.texture_for(text, self.font_size)
+        self.color.rgba = color
+        self.update_rect()
+        
+    def update_rect(self, *args):
+        width, height = self.rect.texture.size
+        self.rect.size = (width, height)
+        self.rect.pos = (self.center_x - width / 2, self.center_y - height / 2)
+        self.scale.origin = self.center
+        
+    def pulse(self, factor=1.25, duration=0.1):
+        """Короткий пульс; предыдущая анимация отменяется"""
+        Animation.cancel_all(self.scale)
+        self.scale.x = self.scale.y = 1
+        anim = (Animation(x=factor, y=factor, duration=duration)
+                + Animation(x=1, y=1, duration=duration))
+        anim.start(self.scale)
+
+class TipText(Widget):
+    """Заранее свёрстанный текст: готовая текстура в Rectangle
+
+    При valign='top' высота виджета следует за текстурой (для вертикальных
+    раскладок и ScrollView), при 'middle' текст центрируется в заданной высоте.
+    """
+    def __init__(self, color, halign='left', valign='top', **kwargs):
+        if valign == 'top':
+            kwargs.update(size_hint_y=None, height=0)
+        super().__init__(**kwargs)
+        self.halign = halign
+        self.valign = valign
+        with self.canvas:
+            Color(*color)
+            self.rect = Rectangle(size=(0, 0))
+        self.bind(pos=self.update_rect, size=self.update_rect)
+        
+    @staticmethod
+    def render(text, font_size, width, halign='left', **options):
+        """Сверстать и растеризовать текст в ширину width; None для пустого текста"""
+        if not text:
+            return None
+        label = CoreLabel(text=text, font_size=font_size, text_size=(width, None),
+                          halign=halign, **options)
+        label.refresh()
+        # refresh() только верстает; bind() растеризует сейчас, а не в кадре показа
+        label.texture.bind()
+        return label.texture
+        
+    def show(self, texture):
+        """Показать готовую текстуру: без вёрстки и растеризации"""
+        self.rect.texture = texture
+        self.rect.size = texture.size if texture else (0, 0)
+        if self.valign == 'top':
+            self.height = self.rect.size[1]
+        self.update_rect()
+        
+    def update_rect(self, *args):
+        width, height = self.rect.size
+        x = self.x if self.halign == 'left' else self.center_x - width / 2
+        y = self.top - height if self.valign == 'top' else self.center_y - height / 2
+        self.rect.pos = (x, y)
+
+class SQLiteStorage:
+    """Постоянное хранилище на SQLite (WAL) с индексом по времени записи"""
+    SCHEMA = (
+        'CREATE TABLE IF NOT EXISTS mood ('
+        ' id INTEGER PRIMARY KEY,'
+        ' ts REAL NOT NULL,'
+        ' mood INTEGER NOT NULL,'
+        " note TEXT NOT NULL DEFAULT '')",
+        'CREATE INDEX IF NOT EXISTS mood_ts ON mood (ts)',
+        # Агрегаты настроения по локальным суткам и часам, обновляются вместе с mood
+        'CREATE TABLE IF NOT EXISTS mood_day ('
+        ' day TEXT PRIMARY KEY, count INTEGER NOT NULL, total INTEGER NOT NULL,'
+        ' low INTEGER NOT NULL, high INTEGER NOT NULL, last INTEGER NOT NULL, last_ts REAL NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS mood_hour ('
+        ' hour INTEGER PRIMARY KEY, count INTEGER NOT NULL, total INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+        # Попытки игры на концентрацию; reaction_ms IS NULL — промах по таймауту
+        'CREATE TABLE IF NOT EXISTS trial ('
+        ' id INTEGER PRIMARY KEY,'
+        ' session_ts REAL NOT NULL,'
+        ' ts REAL NOT NULL,'
+        ' reaction_ms REAL)',
+        'CREATE INDEX IF NOT EXISTS trial_ts ON trial (ts)',
+        # Личные рекорды читаются по индексу: LIMIT K без сортировки всех попыток
+        'CREATE INDEX IF NOT EXISTS trial_reaction ON trial (reaction_ms)'
+        ' WHERE reaction_ms IS NOT NULL',
+        # Итоги попыток по локальным суткам и сессиям, обновляются вместе с trial
+        'CREATE TABLE IF NOT EXISTS trial_day ('
+        ' day TEXT PRIMARY KEY,'
+        ' hits INTEGER NOT NULL, total_ms REAL NOT NULL, best_ms REAL, misses INTEGER NOT NULL)',
+        'CREATE TABLE IF NOT EXISTS trial_session ('
+        ' session_ts REAL PRIMARY KEY,'
+        ' hits INTEGER NOT NULL, total_ms REAL NOT NULL, best_ms REAL, misses INTEGER NOT NULL)',
+        # Сессии медитации: начало, длительность (с) и завершённые циклы дыхания
+        'CREATE TABLE IF NOT EXISTS meditation ('
+        ' id INTEGER PRIMARY KEY,'
+        ' start_ts REAL NOT NULL,'
+        ' duration REAL NOT NULL,'
+        ' cycles INTEGER NOT NULL)',
+        'CREATE INDEX IF NOT EXISTS meditation_start ON meditation (start_ts)',
+    )
+    INSERT_MOOD = 'INSERT INTO mood (id, ts, mood, note) VALUES (?, ?, ?, ?)'
+    # Значения SET считаются по старой строке, поэтому last_ts в CASE — прежний
+    ADD_MOOD_DAY = (
+        'INSERT INTO mood_day VALUES (?1, 1, ?2, ?2, ?2, ?2, ?3) ON CONFLICT (day) DO UPDATE SET'
+        ' count = count + 1, total = total + excluded.total,'
+        ' low = MIN(low, excluded.low), high = MAX(high, excluded.high),'
+        ' last = CASE WHEN excluded.last_ts >= last_ts THEN excluded.last ELSE last END,'
+        ' last_ts = MAX(last_ts, excluded.last_ts)'
+    )
+    ADD_MOOD_HOUR = (
+        'INSERT INTO mood_hour VALUES (?, 1, ?) ON CONFLICT (hour) DO UPDATE SET'
+        ' count = count + 1, total = total + excluded.total'
+    )
+    # Полная перезапись агрегатов — после импорта и для баз, созданных до таблиц агрегатов
+    CLEAR_MOOD_ROLLUPS = ('DELETE FROM mood_day', 'DELETE FROM mood_hour')
+    INSERT_MOOD_DAY = 'INSERT INTO mood_day VALUES (?, ?, ?, ?, ?, ?, ?)'
+    INSERT_MOOD_HOUR = 'INSERT INTO mood_hour VALUES (?, ?, ?)'
+    INSERT_TRIAL = 'INSERT INTO trial (session_ts, ts, reaction_ms) VALUES (?, ?, ?)'
+    ADD_TRIAL_TOTALS = (
+        'INSERT INTO {table} VALUES (?, ?, ?, ?, ?) ON CONFLICT ({key}) DO UPDATE SET'
+        ' hits = hits + excluded.hits, total_ms = total_ms + excluded.total_ms,'
+        ' best_ms = MIN(IFNULL(best_ms, excluded.best_ms), IFNULL(excluded.best_ms, best_ms)),'
+        ' misses = misses + excluded.misses'
+    )
+    ADD_TRIAL_DAY = ADD_TRIAL_TOTALS.format(table='trial_day', key='day')
+    ADD_TRIAL_SESSION = ADD_TRIAL_TOTALS.format(table='trial_session', key='session_ts')
+    # Полный пересчёт итогов — после импорта и для баз, созданных до таблиц итогов
+    REBUILD_TRIAL_TOTALS = (
+        'DELETE FROM trial_day',
+        "INSERT INTO trial_day SELECT date(ts, 'unixepoch', 'localtime'), COUNT(reaction_ms),"
+        ' TOTAL(reaction_ms), MIN(reaction_ms), SUM(reaction_ms IS NULL) FROM trial GROUP BY 1',
+        'DELETE FROM trial_session',
+        'INSERT INTO trial_session SELECT session_ts, COUNT(reaction_ms),'
+        ' TOTAL(reaction_ms), MIN(reaction_ms), SUM(reaction_ms IS NULL) FROM trial GROUP BY 1',
+    )
+    INSERT_MEDITATION = 'INSERT INTO meditation (start_ts, duration, cycles) VALUES (?, ?, ?)'
+    SET_VALUE = 'INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)'
+    # Импорт пропускает записи, которые уже есть (поиск по индексам ts)
+    IMPORT_MOOD = (
+        'INSERT INTO mood (ts, mood, note) SELECT ?1, ?2, ?3'
+        ' WHERE NOT EXISTS (SELECT 1 FROM mood WHERE ts = ?1 AND mood = ?2)'
+    )
+    IMPORT_TRIAL = (
+        'INSERT INTO trial (session_ts, ts, reaction_ms) SELECT ?1, ?2, ?3'
+        ' WHERE NOT EXISTS (SELECT 1 FROM trial WHERE ts = ?2 AND session_ts = ?1)'
+    )
+    IMPORT_MEDITATION = (
+        'INSERT INTO meditation (start_ts, duration, cycles) SELECT ?1, ?2, ?3'
+        ' WHERE NOT EXISTS (SELECT 1 FROM meditation WHERE start_ts = ?1)'
+    )
+    IMPORT_VALUE = 'INSERT OR IGNORE INTO kv (key, value) VALUES (?, ?)'
+
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        # WAL: запись дописывается в журнал, а не переписывает базу;
+        # synchronous=NORMAL не делает fsync на каждый коммит
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        with self.conn:
+            for statement in self.SCHEMA:
+                self.conn.execute(statement)
+
+    def append_mood(self, ts, mood, note='', row_id=None):
+        """Добавить запись настроения (одна вставка, O(1) относительно истории)"""
+        with self.conn:
+            cursor = self.conn.execute(self.INSERT_MOOD, (row_id, ts, mood, note))
+        return cursor.lastrowid
+
+    def append_moods(self, rows):
+        """Пакетная вставка записей (ts, mood, note)"""
+        with self.conn:
+            self.conn.executemany(
+                'INSERT INTO mood (ts, mood, note) VALUES (?, ?, ?)', rows
+            )
+
+    def iter_moods(self, start=None, end=None):
+        """Записи (ts, mood, note) по возрастанию времени в диапазоне [start, end)"""
+        query = 'SELECT ts, mood, note FROM mood'
+        clauses, params = [], []
+        if start is not None:
+            clauses.append('ts >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('ts < ?')
+            params.append(end)
+        if clauses:
+            query += ' WHERE ' + ' AND '.join(clauses)
+        return self.conn.execute(query + ' ORDER BY ts, id', params)
+
+    def iter_mood_columns(self):
+        """(id, ts, mood) без заметок — для загрузки колоночной истории"""
+        return self.conn.execute('SELECT id, ts, mood FROM mood ORDER BY ts, id')
+
+    def iter_notes(self):
+        """(id, note) только для записей с непустой заметкой"""
+        return self.conn.execute("SELECT id, note FROM mood WHERE note != ''")
+
+    def append_trial(self, session_ts, ts, reaction_ms):
+        with self.conn:
+            self.conn.execute(self.INSERT_TRIAL, (session_ts, ts, reaction_ms))
+
+    def execute_batch(self, statements):
+        """Выполнить [(sql, [params, ...]), ...] одной транзакцией — один коммит на пакет"""
+        with self.conn:
+            for sql, rows in statements:
+                self.conn.executemany(sql, rows)
+
+    def iter_trials(self):
+        """(session_ts, ts, reaction_ms) по возрастанию времени"""
+        return self.conn.execute('SELECT session_ts, ts, reaction_ms FROM trial ORDER BY ts, id')
+
+    def iter_meditations(self):
+        """(start_ts, duration, cycles) по возрастанию времени начала"""
+        return self.conn.execute(
+            'SELECT start_ts, duration, cycles FROM meditation ORDER BY start_ts, id'
+        )
+
+    def iter_values(self):
+        """(key, value) всех настроек и счётчиков"""
+        for key, value in self.conn.execute('SELECT key, value FROM kv ORDER BY key'):
+            yield key, json.loads(value)
+
+    def mood_day_totals(self):
+        """(день, записей, сумма, мин, макс, последняя оценка, её ts) по возрастанию дат"""
+        return self.conn.execute('SELECT * FROM mood_day ORDER BY day')
+
+    def mood_hour_totals(self):
+        """(час местного времени, записей, сумма)"""
+        return self.conn.execute('SELECT * FROM mood_hour')
+
+    def mood_rollups_missing(self):
+        """Записи есть, а агрегатов по ним нет (база старше таблиц агрегатов)"""
+        return self.conn.execute(
+            'SELECT EXISTS (SELECT 1 FROM mood) AND NOT EXISTS (SELECT 1 FROM mood_day)'
+        ).fetchone()[0]
+
+    def count_trials(self):
+        return self.conn.execute('SELECT COUNT(*) FROM trial').fetchone()[0]
+
+    def trial_totals(self, by_day):
+        """(ключ, попаданий, сумма мс, лучшая мс, промахов) по локальным суткам или сессиям"""
+        table = 'trial_day' if by_day else 'trial_session'
+        return self.conn.execute(f'SELECT * FROM {table}')
+
+    def trial_totals_missing(self):
+        """Попытки есть, а итогов по ним нет (база старше таблиц итогов)"""
+        return self.conn.execute(
+            'SELECT EXISTS (SELECT 1 FROM trial) AND NOT EXISTS (SELECT 1 FROM trial_session)'
+        ).fetchone()[0]
+
+    def best_trials(self, limit):
+        """(reaction_ms, ts) самых быстрых попаданий"""
+        return self.conn.execute(
+            'SELECT reaction_ms, ts FROM trial WHERE reaction_ms IS NOT NULL'
+            ' ORDER BY reaction_ms, ts LIMIT ?', (limit,)
+        )
+
+    def count_rows(self):
+        """Всего строк в mood, trial, meditation и kv — для подсчёта импортированных"""
+        return self.conn.execute(
+            'SELECT (SELECT COUNT(*) FROM mood) + (SELECT COUNT(*) FROM trial)'
+            ' + (SELECT COUNT(*) FROM meditation) + (SELECT COUNT(*) FROM kv)'
+        ).fetchone()[0]
+
+    def count_moods(self):
+        return self.conn.execute('SELECT COUNT(*) FROM mood').fetchone()[0]
+
+    def max_mood_id(self):
+        return self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM mood').fetchone()[0]
+
+    def get_value(self, key, default=None):
+        row = self.conn.execute('SELECT value FROM kv WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_value(self, key, value):
+        with self.conn:
+            self.conn.execute(self.SET_VALUE, (key, json.dumps(value)))
+
+    def close(self):
+        self.conn.close()
+
+class StorageWriter:
+    """Отложенная запись (write-behind) в фоновом потоке
+
+    UI-поток только ставит ([(sql, [params, ...]), ...], callback) в очередь. Поток-писатель
+    забирает всё накопившееся и проводит одной транзакцией (group commit)
+    через собственное соединение. Колбэки вызываются в UI-потоке через
+    Clock.schedule_once с исключением или None. Без open_storage запись
+    идёт сразу в storage (база в памяти — отдельное соединение её не видит).
+    Если поток-писатель не смог открыть базу и завершился, очередь и
+    дальнейшие записи проводятся синхронно через storage — flush() и
+    close() не зависают.
+    """
+    def __init__(self, open_storage=None, storage=None):
+        self.storage = storage
+        self.commits = 0
+        self.queue = queue.Queue()
+        self.thread = None
+        if open_storage is not None:
+            self.thread = threading.Thread(
+                target=self.run, args=(open_storage,), name='mindwell-writer', daemon=True
+            )
+            self.thread.start()
+
+    def submit(self, sql, params, callback=None):
+        self.submit_many(sql, [params], callback)
+
+    def submit_many(self, sql, rows, callback=None):
+        """Поставить в очередь один запрос для нескольких строк параметров"""
+        self.submit_batch([(sql, rows)], callback)
+
+    def submit_batch(self, statements, callback=None):
+        """Поставить в очередь [(sql, [params, ...]), ...] — они всегда попадут в одну транзакцию"""
+        if self.thread is not None and not self.thread.is_alive():
+            self.fall_back()
+        if self.thread is None:
+            self.commit(self.storage, [(statements, callback)])
+        else:
+            self.queue.put((statements, callback))
+
+    def run(self, open_storage):
+        try:
+            storage = open_storage()
+        except Exception:
+            from kivy.logger import Logger
+            Logger.exception('MindWell: writer cannot open the database, writing synchronously')
+            return
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            try:
+                while True:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                writes = [item for item in batch if item is not None]
+                running = len(writes) == len(batch)  # None — сигнал остановки от close()
+                if writes:
+                    self.commit(storage, writes)
+            finally:
+                # Иначе flush() (queue.join) ждал бы вечно
+                for _ in batch:
+                    self.queue.task_done()
+        storage.close()
+
+    def fall_back(self):
+        """Поток-писатель завершился: провести очередь синхронно и писать дальше без него"""
+        self.thread = None
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                self.commit(self.storage, [item])
+            self.queue.task_done()
+
+    def commit(self, storage, batch):
+        error = None
+        try:
+            storage.execute_batch([statement for statements, _ in batch for statement in statements])
+        except Exception as exc:
+            # Ошибка доходит до колбэков, поток-писатель продолжает работу
+            from kivy.logger import Logger
+            Logger.exception(f'MindWell: failed to write {len(batch)} records')
+            error = exc
+        self.commits += 1
+        for _, callback in batch:
+            if callback is not None:
+                Clock.schedule_once(lambda dt, callback=callback: callback(error))
+
+    def flush(self):
+        """Дождаться записи всего, что уже в очереди"""
+        # Не queue.join(): если поток умрёт во время ожидания, join не вернётся
+        done = self.queue.all_tasks_done
+        while self.thread is not None:
+            if not self.thread.is_alive():
+                self.fall_back()
+                break
+            with done:
+                if not self.queue.unfinished_tasks:
+                    break
+                done.wait(0.1)
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.fall_back()  # поток мог умереть раньше и оставить записи в очереди
+
+def to_timestamp(value):
+    """datetime/date/число -> epoch-время (локальное время для наивных дат)"""
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, datetime.date):
+        return local_day_start(value)
+    return float(value)
+
+def local_day_start(day):
+    """Начало локальных суток (учитывает переход на летнее время)"""
+    return datetime.datetime.combine(day, datetime.time.min).timestamp()
+
+# Экспорт: JSON Lines — полная копия (настройки, настроение, попытки, медитации),
+# CSV — только записи настроения, для таблиц
+CSV_FIELDS = ('date', 'ts', 'mood', 'note')
+MAX_NOTE_LENGTH = 10000
+MAX_REACTION_MS = 60000
+MAX_SESSION_SECONDS = 24 * 3600
+MAX_COUNTER = 10 ** 9
+
+def valid_counter(value):
+    return type(value) is int and 0 <= value <= MAX_COUNTER
+
+def valid_language(value):
+    """Код языка, для которого есть каталог в locales/"""
+    return (isinstance(value, str) and 0 < len(value) <= 16
+            and value.replace('_', '').replace('-', '').isalnum()
+            and os.path.exists(os.path.join(LanguageManager.LOCALES_DIR, f'{value}.json')))
+
+def valid_transition_level(value):
+    return type(value) is int and 0 <= value < len(Router.LEVELS)
+
+# Известные настройки: ключ -> (значение по умолчанию, проверка значения).
+# Импорт и загрузка принимают только их, чтобы чужое значение не ломало запуск.
+SETTINGS = {
+    'meditation_sessions': (0, valid_counter),
+    'concentration_score': (0, valid_counter),
+    'language': ('en', valid_language),
+    'transition_level': (0, valid_transition_level),
+}
+
+def validate_record(record):
+    """Запись импорта -> (тип, строка параметров) или None, если запись некорректна"""
+    if not isinstance(record, dict):
+        return None
+    kind = record.get('type')
+    try:
+        if kind == 'mood':
+            ts = float(record['ts'])
+            mood = int(record['mood'])
+            note = record.get('note') or ''
+            if (not math.isfinite(ts) or ts <= 0 or float(record['mood']) != mood
+                    or not 1 <= mood <= 5 or not isinstance(note, str)
+                    or len(note) > MAX_NOTE_LENGTH):
+                return None
+            return kind, (ts, mood, note)
+        if kind == 'trial':
+            session_ts = float(record['session_ts'])
+            ts = float(record['ts'])
+            reaction_ms = record.get('reaction_ms')
+            if reaction_ms in (None, ''):
+                reaction_ms = None  # промах
+            else:
+                reaction_ms = float(reaction_ms)
+                if not 0 <= reaction_ms <= MAX_REACTION_MS:
+                    return None
+            if not (math.isfinite(session_ts) and math.isfinite(ts)) or min(session_ts, ts) <= 0:
+                return None
+            return kind, (session_ts, ts, reaction_ms)
+        if kind == 'meditation':
+            start_ts = float(record['start_ts'])
+            duration = float(record['duration'])
+            cycles = int(record.get('cycles') or 0)
+            if (not math.isfinite(start_ts) or start_ts <= 0
+                    or not 0 < duration <= MAX_SESSION_SECONDS or cycles < 0):
+                return None
+            return kind, (start_ts, duration, cycles)
+        if kind == 'setting':
+            key, value = record['key'], record['value']
+            if key not in SETTINGS or not SETTINGS[key][1](value):
+                return None
+            return kind, (key, json.dumps(value))
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return None
+    return None
+
+def iter_jsonl_records(lines):
+    """Строки JSON Lines -> словари; нечитаемая строка даёт None"""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+def iter_csv_records(lines):
+    """Строки CSV (date, ts, mood, note) -> записи настроения"""
+    import csv
+    for row in csv.DictReader(lines):
+        if not row.get('ts') and row.get('date'):
+            try:
+                row['ts'] = datetime.datetime.fromisoformat(row['date']).timestamp()
+            except ValueError:
+                pass
+        row['type'] = 'mood'
+        yield row
+
+class MoodHistory:
+    """Колоночная история настроения в памяти
+
+    Метки времени, оценки и id записей хранятся в массивах array,
+    заметки подгружаются из хранилища только при первом обращении.
+    Для совместимости ведёт себя как список словарей {'date', 'mood', 'note'}.
+    """
+    def __init__(self, storage=None):
+        self.storage = storage
+        self.timestamps = array('d')  # отсортированы, служат индексом для bisect
+        self.moods = array('b')
+        self.ids = array('q')
+        self._notes = None if storage else {}
+        self._new_notes = {}  # заметки, которые могут быть ещё в очереди записи
+
+    def load(self, rows):
+        """Заполнить из строк (id, ts, mood), упорядоченных по времени"""
+        for row_id, ts, mood in rows:
+            self.ids.append(row_id)
+            self.timestamps.append(ts)
+            self.moods.append(mood)
+
+    def insert(self, ts, mood, note='', row_id=0):
+        """Вставить запись с сохранением порядка; возвращает её индекс"""
+        # Обычно это дозапись в конец; bisect страхует от перевода часов назад
+        index = bisect.bisect_right(self.timestamps, ts)
+        if index == len(self.timestamps):
+            self.timestamps.append(ts)
+            self.moods.append(mood)
+            self.ids.append(row_id)
+        else:
+            self.timestamps.insert(index, ts)
+            self.moods.insert(index, mood)
+            self.ids.insert(index, row_id)
+        if note:
+            if self._notes is None:
+                self._new_notes[row_id] = note
+            else:
+                self._notes[row_id] = note
+        return index
+
+    def note(self, index):
+        if self._notes is None:
+            self._notes = dict(self.storage.iter_notes())
+            self._notes.update(self._new_notes)
+            self._new_notes = {}
+        return self._notes.get(self.ids[index], '')
+
+    def entry(self, index):
+        return {
+            'date': datetime.datetime.fromtimestamp(self.timestamps[index]).isoformat(),
+            'mood': self.moods[index],
+            'note': self.note(index)
         }
-        self.data['mood_history'].append(entry)
-        
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entry(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('mood history index out of range')
+        return self.entry(index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.entry(i)
+
+class MoodRollups:
+    """Агрегаты настроения по дням, неделям и месяцам
+
+    Каждая корзина — {'count', 'sum', 'min', 'max', 'last', 'last_ts'};
+    add() обновляет три корзины за O(1), rebuild() пересчитывает всё из истории.
+    Отдельно копятся счётчики и суммы по часам местного времени. Дни и часы
+    хранятся в базе, и при старте load() читает их вместо пересчёта.
+    """
+    PERIODS = ('day', 'week', 'month')
+
+    def __init__(self):
+        self.buckets = {period: {} for period in self.PERIODS}
+        self.hour_counts = [0] * 24
+        self.hour_sums = [0] * 24
+
+    @staticmethod
+    def period_keys(day):
+        year, week, _ = day.isocalendar()
+        return (('day', day), ('week', (year, week)), ('month', (day.year, day.month)))
+
+    def add(self, ts, mood, day=None, hour=None):
+        if day is None:
+            moment = datetime.datetime.fromtimestamp(ts)
+            day, hour = moment.date(), moment.hour
+        elif hour is None:
+            hour = datetime.datetime.fromtimestamp(ts).hour
+        self.hour_counts[hour] += 1
+        self.hour_sums[hour] += mood
+        for period, key in self.period_keys(day):
+            bucket = self.buckets[period].get(key)
+            if bucket is None:
+                self.buckets[period][key] = {
+                    'count': 1, 'sum': mood, 'min': mood, 'max': mood,
+                    'last': mood, 'last_ts': ts
+                }
+                continue
+            bucket['count'] += 1
+            bucket['sum'] += mood
+            if mood < bucket['min']:
+                bucket['min'] = mood
+            if mood > bucket['max']:
+                bucket['max'] = mood
+            if ts >= bucket['last_ts']:
+                bucket['last'] = mood
+                bucket['last_ts'] = ts
+
+    def rebuild(self, timestamps, moods):
+        """Пересчитать все корзины из сырой истории"""
+        self.buckets = {period: {} for period in self.PERIODS}
+        self.hour_counts = [0] * 24
+        self.hour_sums = [0] * 24
+        day, day_end = None, 0.0
+        for ts, mood in zip(timestamps, moods):
+            # История отсортирована: дата вычисляется один раз на сутки
+            if day is None or not day_start <= ts < day_end:
+                day = datetime.date.fromtimestamp(ts)
+                day_start = local_day_start(day)
+                day_end = local_day_start(day + datetime.timedelta(days=1))
+                regular = day_end - day_start == 86400
+            # Час считается от полуночи; в дни перевода часов — через datetime
+            hour = int((ts - day_start) // 3600) if regular else None
+            self.add(ts, mood, day, hour)
+
+    def load(self, day_rows, hour_rows):
+        """Восстановить корзины из сохранённых итогов по дням и часам; недели и месяцы — из дней"""
+        self.buckets = {period: {} for period in self.PERIODS}
+        self.hour_counts = [0] * 24
+        self.hour_sums = [0] * 24
+        for day, count, total, low, high, last, last_ts in day_rows:
+            for period, key in self.period_keys(datetime.date.fromisoformat(day)):
+                bucket = self.buckets[period].get(key)
+                if bucket is None:
+                    self.buckets[period][key] = {
+                        'count': count, 'sum': total, 'min': low, 'max': high,
+                        'last': last, 'last_ts': last_ts
+                    }
+                    continue
+                bucket['count'] += count
+                bucket['sum'] += total
+                bucket['min'] = min(bucket['min'], low)
+                bucket['max'] = max(bucket['max'], high)
+                if last_ts >= bucket['last_ts']:
+                    bucket['last'] = last
+                    bucket['last_ts'] = last_ts
+        for hour, count, total in hour_rows:
+            self.hour_counts[hour] = count
+            self.hour_sums[hour] = total
+
+    def day_rows(self):
+        """Строки для таблицы mood_day"""
+        return [
+            (day.isoformat(), b['count'], b['sum'], b['min'], b['max'], b['last'], b['last_ts'])
+            for day, b in self.buckets['day'].items()
+        ]
+
+    def hour_rows(self):
+        """Строки для таблицы mood_hour"""
+        return [(hour, count, total) for hour, (count, total)
+                in enumerate(zip(self.hour_counts, self.hour_sums)) if count]
+
+    def get(self, period, key):
+        return self.buckets[period].get(key)
+
+    def mean(self, period, key):
+        bucket = self.buckets[period].get(key)
+        return bucket['sum'] / bucket['count'] if bucket else None
+
+class MeditationLog:
+    """Журнал сессий медитации с инкрементальными агрегатами
+
+    Минуты по дням и неделям, самая длинная сессия и серии дней подряд
+    обновляются в add() за O(1) и отдаются без повторного чтения журнала.
+    Сессии добавляются по времени; записи из прошлого (импорт) — через rebuild().
+    """
+    def __init__(self):
+        self.day_seconds = {}   # дата -> секунд медитации
+        self.week_seconds = {}  # (год, неделя ISO) -> секунд
+        self.sessions = 0
+        self.total_seconds = 0.0
+        self.total_cycles = 0
+        self.longest = None     # (секунд, start_ts) самой длинной сессии
+        self.last_day = None
+        self.run = 0            # дней подряд, заканчивая last_day
+        self.longest_run = 0
+
+    def add(self, start_ts, duration, cycles=0):
+        day = datetime.date.fromtimestamp(start_ts)
+        year, week, _ = day.isocalendar()
+        self.day_seconds[day] = self.day_seconds.get(day, 0) + duration
+        self.week_seconds[(year, week)] = self.week_seconds.get((year, week), 0) + duration
+        self.sessions += 1
+        self.total_seconds += duration
+        self.total_cycles += cycles
+        if self.longest is None or duration > self.longest[0]:
+            self.longest = (duration, start_ts)
+        if self.last_day is None or day > self.last_day:
+            consecutive = self.last_day is not None and (day - self.last_day).days == 1
+            self.run = self.run + 1 if consecutive else 1
+            self.last_day = day
+            self.longest_run = max(self.longest_run, self.run)
+
+    def rebuild(self, rows):
+        """Пересчитать из строк (start_ts, duration, cycles), упорядоченных по времени"""
+        self.__init__()
+        for start_ts, duration, cycles in rows:
+            self.add(start_ts, duration, cycles)
+
+    def minutes_on(self, day):
+        return self.day_seconds.get(day, 0) / 60
+
+    def minutes_in_week(self, day):
+        year, week, _ = day.isocalendar()
+        return self.week_seconds.get((year, week), 0) / 60
+
+    def current_streak(self, today=None):
+        """Дней подряд с медитацией; серия жива, если последняя была сегодня или вчера"""
+        today = today or datetime.date.today()
+        if self.last_day is None or (today - self.last_day).days > 1:
+            return 0
+        return self.run
+
+class ConcentrationLog:
+    """Итоги игры на концентрацию: личные рекорды, дни и сессии
+
+    K лучших реакций хранятся в ограниченной куче, итоги по дням и сессиям —
+    в счётчиках [попаданий, сумма мс, лучшая мс, промахов]. add() стоит
+    O(log K), чтения — O(1) или O(K), без прохода по всем попыткам.
+    Итоги по дням и сессиям хранятся и в базе (trial_day, trial_session),
+    поэтому старт читает их и K лучших по индексу, а не все попытки.
+    """
+    TOP_K = 10
+
+    def __init__(self, k=TOP_K):
+        self.k = k
+        self.heap = []      # (-reaction_ms, ts): на вершине худший из K лучших
+        self.days = {}      # дата -> [попаданий, сумма мс, лучшая мс, промахов]
+        self.sessions = {}  # session_ts -> то же
+
+    @staticmethod
+    def count(totals, key, reaction_ms):
+        row = totals.get(key)
+        if row is None:
+            row = totals[key] = [0, 0.0, None, 0]
+        if reaction_ms is None:
+            row[3] += 1
+            return
+        row[0] += 1
+        row[1] += reaction_ms
+        if row[2] is None or reaction_ms < row[2]:
+            row[2] = reaction_ms
+
+    def add(self, session_ts, ts, reaction_ms, day=None):
+        self.count(self.days, day or datetime.date.fromtimestamp(ts), reaction_ms)
+        self.count(self.sessions, session_ts, reaction_ms)
+        if reaction_ms is not None:
+            self.push_best(reaction_ms, ts)
+
+    def push_best(self, reaction_ms, ts):
+        item = (-reaction_ms, ts)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item > self.heap[0]:  # быстрее худшего из K лучших
+            heapq.heapreplace(self.heap, item)
+
+    def load(self, storage):
+        """Прочитать итоги и K лучших реакций из хранилища"""
+        self.__init__(self.k)
+        for day, hits, total, best, misses in storage.trial_totals(by_day=True):
+            self.days[datetime.date.fromisoformat(day)] = [hits, total, best, misses]
+        for session_ts, hits, total, best, misses in storage.trial_totals(by_day=False):
+            self.sessions[session_ts] = [hits, total, best, misses]
+        for reaction_ms, ts in storage.best_trials(self.k):
+            self.push_best(reaction_ms, ts)
+
+    def personal_bests(self):
+        """[(reaction_ms, ts), ...] от лучшего, не больше K"""
+        return sorted((-negative, ts) for negative, ts in self.heap)
+
+    @property
+    def best(self):
+        return -max(self.heap)[0] if self.heap else None
+
+    @staticmethod
+    def summary(row):
+        if row is None:
+            return None
+        hits, total, best, misses = row
+        return {'hits': hits, 'misses': misses, 'best': best, 'mean': total / hits if hits else None}
+
+    def day_stats(self, day):
+        """{'hits', 'misses', 'best', 'mean'} за локальные сутки или None"""
+        return self.summary(self.days.get(day))
+
+    def session_stats(self, session_ts):
+        return self.summary(self.sessions.get(session_ts))
+
+    def trend(self, days, today=None):
+        """[(дата, лучшая мс, средняя мс), ...] за последние days суток, только дни с попаданиями"""
+        today = today or datetime.date.today()
+        trend = []
+        for offset in range(days - 1, -1, -1):
+            day = today - datetime.timedelta(days=offset)
+            stats = self.day_stats(day)
+            if stats and stats['hits']:
+                trend.append((day, stats['best'], stats['mean']))
+        return trend
+
+class DataManager:
+    """Менеджер данных для сохранения состояния приложения
+
+    Состояние в памяти обновляется сразу, запись на диск уходит в
+    StorageWriter и не блокирует UI-поток.
+    """
+    storage_class = SQLiteStorage
+
+    def __init__(self, path=None):
+        # Без пути данные живут только в памяти (как раньше) и пишутся синхронно
+        self.storage = self.storage_class(path or ':memory:')
+        if path:
+            # storage — запасной путь записи, если поток-писатель не откроет базу
+            self.writer = StorageWriter(lambda: self.storage_class(path), self.storage)
+        else:
+            self.writer = StorageWriter(storage=self.storage)
+        # id записей выдаём сами, чтобы история знала их до коммита
+        self.next_mood_id = self.storage.max_mood_id() + 1
+        self.mood_history = MoodHistory(self.storage)
+        self.mood_history.load(self.storage.iter_mood_columns())
+        self.rollups = MoodRollups()
+        if self.storage.mood_rollups_missing():
+            self.rebuild_rollups()
+        else:
+            self.rollups.load(self.storage.mood_day_totals(), self.storage.mood_hour_totals())
+        self.meditation_log = MeditationLog()
+        self.meditation_log.rebuild(self.storage.iter_meditations())
+        if self.storage.trial_totals_missing():
+            self.rebuild_trial_totals()
+        self.concentration_log = ConcentrationLog()
+        self.concentration_log.load(self.storage)
+        self.revision = 0  # растёт при каждой записи, ключ для кэшей производных данных
+        self.data = {'mood_history': self.mood_history}
+        self.load_values()
+        self.analytics = MoodAnalytics(self)
+
+    def load_values(self):
+        # Битое или чужое значение в базе заменяется значением по умолчанию
+        for key, (default, is_valid) in SETTINGS.items():
+            value = self.storage.get_value(key, default)
+            self.data[key] = value if is_valid(value) else default
+
+    def save_mood(self, mood, note="", callback=None):
+        """Записать настроение; callback(error) — в UI-потоке после коммита"""
+        ts = datetime.datetime.now().timestamp()
+        moment = datetime.datetime.fromtimestamp(ts)
+        day, hour = moment.date(), moment.hour
+        row_id = self.next_mood_id
+        self.next_mood_id += 1
+        # Запись и её агрегаты — одной транзакцией, чтобы итоги не разошлись с mood
+        self.writer.submit_batch([
+            (SQLiteStorage.INSERT_MOOD, [(row_id, ts, mood, note)]),
+            (SQLiteStorage.ADD_MOOD_DAY, [(day.isoformat(), mood, ts)]),
+            (SQLiteStorage.ADD_MOOD_HOUR, [(hour, mood)]),
+        ], callback)
+        self.mood_history.insert(ts, mood, note, row_id)
+        self.rollups.add(ts, mood, day, hour)
+        self.revision += 1
+
+    def set_value(self, key, value):
+        """Сохранить счётчик или настройку"""
+        self.data[key] = value
+        self.writer.submit(SQLiteStorage.SET_VALUE, (key, json.dumps(value)))
+        self.revision += 1
+
+    def add_meditation_session(self, start_ts, duration, cycles=0):
+        """Сохранить сессию медитации (начало — epoch, длительность — секунды)"""
+        self.writer.submit(SQLiteStorage.INSERT_MEDITATION, (start_ts, duration, cycles))
+        self.meditation_log.add(start_ts, duration, cycles)
+        self.set_value('meditation_sessions', self.data['meditation_sessions'] + 1)
+
+    def meditation_by_day(self):
+        """{дата: минут медитации}"""
+        return {day: seconds / 60 for day, seconds in self.meditation_log.day_seconds.items()}
+
+    def update_concentration_score(self, score):
+        if score > self.data.get('concentration_score', 0):
+            self.set_value('concentration_score', score)
+
+    def _mood_range(self, start=None, end=None):
+        """Границы среза [lo, hi) для интервала [start, end) за O(log n)"""
+        timestamps = self.mood_history.timestamps
+        lo = 0 if start is None else bisect.bisect_left(timestamps, to_timestamp(start))
+        hi = len(timestamps) if end is None else bisect.bisect_left(timestamps, to_timestamp(end))
+        return lo, max(lo, hi)
+
+    def moods_between(self, start=None, end=None):
+        """Записи настроения в интервале [start, end) за O(log n + k)"""
+        lo, hi = self._mood_range(start, end)
+        return self.mood_history[lo:hi]
+
+    def moods_for_last(self, days):
+        """Записи за последние days локальных суток, включая сегодня"""
+        first_day = datetime.date.today() - datetime.timedelta(days=days - 1)
+        return self.moods_between(first_day)
+
+    def daily_moods(self, days):
+        """Средние значения по локальным суткам: [(date, mean), ...] только для дней с записями"""
+        today = datetime.date.today()
+        daily = []
+        for offset in range(days - 1, -1, -1):
+            day = today - datetime.timedelta(days=offset)
+            mean = self.rollups.mean('day', day)
+            if mean is not None:
+                daily.append((day, mean))
+        return daily
+
+    def save_trial(self, session_ts, reaction_ms):
+        """Сохранить попытку игры на концентрацию (None — промах)"""
+        ts = datetime.datetime.now().timestamp()
+        day = datetime.date.fromtimestamp(ts)
+        hit = reaction_ms is not None
+        totals = (int(hit), reaction_ms or 0.0, reaction_ms, int(not hit))
+        self.writer.submit(SQLiteStorage.INSERT_TRIAL, (session_ts, ts, reaction_ms))
+        self.writer.submit(SQLiteStorage.ADD_TRIAL_DAY, (day.isoformat(),) + totals)
+        self.writer.submit(SQLiteStorage.ADD_TRIAL_SESSION, (session_ts,) + totals)
+        self.concentration_log.add(session_ts, ts, reaction_ms, day)
+        self.revision += 1
+
+    def rebuild_rollups(self):
+        """Пересчитать агрегаты настроения из истории и переписать их в базе"""
+        self.rollups.rebuild(self.mood_history.timestamps, self.mood_history.moods)
+        self.writer.submit_batch(
+            [(sql, [()]) for sql in SQLiteStorage.CLEAR_MOOD_ROLLUPS] + [
+                (SQLiteStorage.INSERT_MOOD_DAY, self.rollups.day_rows()),
+                (SQLiteStorage.INSERT_MOOD_HOUR, self.rollups.hour_rows()),
+            ]
+        )
+
+    def rebuild_trial_totals(self):
+        """Пересчитать таблицы итогов попыток из trial (через поток записи)"""
+        for sql in SQLiteStorage.REBUILD_TRIAL_TOTALS:
+            self.writer.submit(sql, ())
+        self.flush()
+
+    def concentration_by_day(self):
+        """{дата: число попаданий} по локальным суткам"""
+        return {day: row[0] for day, row in self.concentration_log.days.items() if row[0]}
+
     def get_recent_moods(self, days=7):
-        if not self.data['mood_history']:
+        """Среднее настроение по дням за последние days суток"""
+        daily = self.daily_moods(days)
+        if not daily:
             return [3, 4, 2, 5, 3, 4, 4]  # Пример данных
-        return [entry['mood'] for entry in self.data['mood_history'][-days:]]
+        return [mean for day, mean in daily]
 
-class LanguageManager:
-    """Менеджер локализации для многоязычной поддержки"""
-    def __init__(self):
-        self.translations = {
-            'en': {
-                'mood_tracker': 'Mood\nTracker',
-                'meditate': 'Meditate',
-                'concentration': 'Concentration',
-                'emotional_intelligence': 'Emotional Intelligence',
-                'track_mood': 'Track your mood\nand reflect on your\nemotional patterns',
-                'track_button': 'Track',
-                'start_button': 'Start',
-                'meditation_benefit': 'Regular meditation has\nbeen shown to reduce\nstress and improve overall\nwell-being.',
-                'concentration_desc': 'Focus on a task to enhance\ncognitive performance',
-                'ei_desc': 'Improve self-awareness and\ninterpersonal skills',
-                'how_feeling': 'How are you feeling today?',
-                'very_bad': 'Very Bad',
-                'bad': 'Bad',
-                'okay': 'Okay',
-                'good': 'Good',
-                'excellent': 'Excellent',
-                'save_mood': 'Save Mood',
-                'meditation_timer': 'Meditation Timer',
-                'breathe_in': 'Breathe In',
-                'breathe_out': 'Breathe Out',
-                'hold': 'Hold',
-                'well_done': 'Well Done!',
-                'session_complete': 'Meditation session completed',
-                'concentration_game': 'Concentration Exercise',
-                'focus_circle': 'Focus on the circle and tap when it turns green',
-                'reaction_time': 'Reaction Time: {} ms',
-                'ei_tip': 'Daily EQ Tip',
-                'settings': 'Settings',
-                'language': 'Language'
-            },
-            'ru': {
-                'mood_tracker': 'Трекер\nНастроения',
-                'meditate': 'Медитация',
-                'concentration': 'Концентрация',
-                'emotional_intelligence': 'Эмоциональный Интеллект',
-                'track_mood': 'Отслеживайте настроение\nи анализируйте свои\nэмоциональные паттерны',
-                'track_button': 'Отследить',
-                'start_button': 'Начать',
-                'meditation_benefit': 'Регулярная медитация\nснижает стресс и улучшает\nобщее самочувствие.',
-                'concentration_desc': 'Сосредоточьтесь на задаче\nдля улучшения когнитивных\nспособностей',
-                'ei_desc': 'Развивайте самосознание\nи навыки общения',
-                'how_feeling': 'Как вы себя чувствуете сегодня?',
-                'very_bad': 'Очень плохо',
-                'bad': 'Плохо',
-                'okay': 'Нормально',
-                'good': 'Хорошо',
-                'excellent': 'Отлично',
-                'save_mood': 'Сохранить',
-                'meditation_timer': 'Таймер Медитации',
-                'breathe_in': 'Вдох',
-                'breathe_out': 'Выдох',
-                'hold': 'Задержка',
-                'well_done': 'Отлично!',
-                'session_complete': 'Сессия медитации завершена',
-                'concentration_game': 'Упражнение на Концентрацию',
-                'focus_circle': 'Следите за кругом и нажмите, когда он станет зеленым',
-                'reaction_time': 'Время реакции: {} мс',
-                'ei_tip': 'Совет дня по EQ',
-                'settings': 'Настройки',
-                'language': 'Язык'
-            },
-            'zh': {
-                'mood_tracker': '情绪\n追踪器',
-                'meditate': '冥想',
-                'concentration': '专注力',
-                'emotional_intelligence': '情商',
-                'track_mood': '追踪您的情绪\n并反思您的\n情感模式',
-                'track_button': '追踪',
-                'start_button': '开始',
-                'meditation_benefit': '定期冥想已被证明\n可以减轻压力并改善\n整体健康状况。',
-                'concentration_desc': '专注于任务以增强\n认知能力',
-                'ei_desc': '提高自我意识和\n人际交往技能',
-                'how_feeling': '您今天感觉如何？',
-                'very_bad': '很差',
-                'bad': '差',
-                'okay': '还行',
-                'good': '好',
-                'excellent': '非常好',
-                'save_mood': '保存情绪',
-                'meditation_timer': '冥想计时器',
-                'breathe_in': '吸气',
-                'breathe_out': '呼气',
-                'hold': '屏息',
-                'well_done': '做得好！',
-                'session_complete': '冥想课程已完成',
-                'concentration_game': '专注力练习',
-                'focus_circle': '注视圆圈，当它变绿时点击',
-                'reaction_time': '反应时间：{} 毫秒',
-                'ei_tip': '每日情商小贴士',
-                'settings': '设置',
-                'language': '语言'
+    def export_records(self):
+        """Вся история потоком словарей: настройки, настроение, попытки, медитации"""
+        self.flush()
+        for key, value in self.storage.iter_values():
+            yield {'type': 'setting', 'key': key, 'value': value}
+        for ts, mood, note in self.storage.iter_moods():
+            yield {'type': 'mood', 'ts': ts, 'mood': mood, 'note': note}
+        for session_ts, ts, reaction_ms in self.storage.iter_trials():
+            yield {'type': 'trial', 'session_ts': session_ts, 'ts': ts, 'reaction_ms': reaction_ms}
+        for start_ts, duration, cycles in self.storage.iter_meditations():
+            yield {'type': 'meditation', 'start_ts': start_ts, 'duration': duration, 'cycles': cycles}
+
+    def export_jsonl(self, f):
+        """Записать полную копию в JSON Lines; вернуть число записей"""
+        count = 0
+        for record in self.export_records():
+            f.write(json.dumps(record, ensure_ascii=False))
+            f.write('\n')
+            count += 1
+        return count
+
+    def export_csv(self, f):
+        """Записать историю настроения в CSV (файл открыт с newline=''); вернуть число строк"""
+        import csv
+        self.flush()
+        writer = csv.writer(f)
+        writer.writerow(CSV_FIELDS)
+        count = 0
+        for ts, mood, note in self.storage.iter_moods():
+            writer.writerow((datetime.datetime.fromtimestamp(ts).isoformat(), ts, mood, note))
+            count += 1
+        return count
+
+    IMPORT_SQL = {
+        'mood': SQLiteStorage.IMPORT_MOOD,
+        'trial': SQLiteStorage.IMPORT_TRIAL,
+        'meditation': SQLiteStorage.IMPORT_MEDITATION,
+        'setting': SQLiteStorage.IMPORT_VALUE,
+    }
+
+    def import_records(self, records, chunk_size=10000):
+        """Импорт потока записей кусками по chunk_size
+
+        Каждый кусок уходит одной транзакцией, и следующий читается только
+        после его записи — в памяти не больше одного куска. Записи, которые
+        уже есть (то же время и оценка), пропускаются; настройки, уже
+        заданные на этом устройстве, не перезаписываются.
+        Возвращает {'imported', 'duplicates', 'invalid'}.
+        """
+        self.flush()
+        rows_before = self.storage.count_rows()
+        chunk = {kind: [] for kind in self.IMPORT_SQL}
+        pending = valid = invalid = 0
+
+        def write_chunk():
+            for kind, rows in chunk.items():
+                if rows:
+                    self.writer.submit_many(self.IMPORT_SQL[kind], rows)
+                    chunk[kind] = []
+            self.flush()
+
+        for record in records:
+            parsed = validate_record(record)
+            if parsed is None:
+                invalid += 1
+                continue
+            kind, row = parsed
+            chunk[kind].append(row)
+            valid += 1
+            pending += 1
+            if pending >= chunk_size:
+                write_chunk()
+                pending = 0
+        write_chunk()
+
+        imported = self.storage.count_rows() - rows_before
+        if imported:
+            self.reload()
+        return {'imported': imported, 'duplicates': valid - imported, 'invalid': invalid}
+
+    def import_jsonl(self, f, chunk_size=10000):
+        return self.import_records(iter_jsonl_records(f), chunk_size)
+
+    def import_csv(self, f, chunk_size=10000):
+        return self.import_records(iter_csv_records(f), chunk_size)
+
+    def reload(self):
+        """Перечитать историю, агрегаты и счётчики из хранилища (после импорта)"""
+        self.next_mood_id = self.storage.max_mood_id() + 1
+        self.mood_history = MoodHistory(self.storage)
+        self.mood_history.load(self.storage.iter_mood_columns())
+        self.rollups = MoodRollups()
+        self.rebuild_rollups()
+        self.meditation_log.rebuild(self.storage.iter_meditations())
+        self.rebuild_trial_totals()
+        self.concentration_log.load(self.storage)
+        self.data['mood_history'] = self.mood_history
+        self.load_values()
+        self.revision += 1
+
+    def flush(self):
+        """Дождаться записи на диск всего, что уже сохранено"""
+        self.writer.flush()
+
+    def close(self):
+        self.writer.close()
+        self.storage.close()
+
+def population_std(values):
+    """Стандартное отклонение (по всей совокупности); None для пустого ряда"""
+    if not len(values):
+        return None
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / len(values))
+
+def pearson(xs, ys):
+    """Корреляция Пирсона; None, если точек меньше трёх или ряд постоянен"""
+    n = len(xs)
+    if n < 3:
+        return None
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    cov = var_x = var_y = 0.0
+    for x, y in zip(xs, ys):
+        dx, dy = x - mean_x, y - mean_y
+        cov += dx * dy
+        var_x += dx * dx
+        var_y += dy * dy
+    if not var_x or not var_y:
+        return None
+    return cov / math.sqrt(var_x * var_y)
+
+def load_numpy():
+    """NumPy, если установлен (необязательная зависимость), иначе None"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+class MoodAnalytics:
+    """Аналитика настроения поверх DataManager
+
+    Считает по дневным рядам из MoodRollups — O(дней), а не O(записей):
+    скользящие средние, дни недели, серии, волатильность и корреляцию с
+    практиками; время суток — по почасовым агрегатам. С NumPy ряды
+    обрабатываются векторно, без него — на array и чистом Python. NumPy
+    импортируется при первом расчёте, не на старте. Результаты кэшируются
+    до следующей записи (DataManager.revision).
+    """
+    def __init__(self, data_manager, use_numpy=None):
+        self.data_manager = data_manager
+        self.use_numpy = use_numpy
+        self._np = None
+        # Источники активности для корреляций: имя -> функция {дата: значение}
+        self.activities = {
+            'meditation': data_manager.meditation_by_day,
+            'concentration': data_manager.concentration_by_day,
+        }
+        self.cache = {}
+        self.cache_revision = None
+
+    @property
+    def np(self):
+        if self._np is None:
+            self._np = (self.use_numpy is not False and load_numpy()) or False
+        return self._np
+
+    def cached(self, key, compute):
+        revision = self.data_manager.revision
+        if revision != self.cache_revision:
+            self.cache = {}
+            self.cache_revision = revision
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def day_series(self):
+        """(ординалы дней, число записей, суммы оценок) по возрастанию дат"""
+        return self.cached('days', self._day_series)
+
+    def _day_series(self):
+        days = self.data_manager.rollups.buckets['day']
+        keys = sorted(days)
+        ordinals = array('l', [day.toordinal() for day in keys])
+        counts = array('l', [days[day]['count'] for day in keys])
+        sums = array('l', [days[day]['sum'] for day in keys])
+        np = self.np
+        if np:
+            return (np.array(ordinals, dtype=np.int64), np.array(counts, dtype=np.float64),
+                    np.array(sums, dtype=np.float64))
+        return ordinals, counts, sums
+
+    def daily_means(self):
+        def compute():
+            ordinals, counts, sums = self.day_series()
+            if self.np:
+                return sums / counts
+            return array('d', [total / count for total, count in zip(sums, counts)])
+        return self.cached('means', compute)
+
+    def rolling_average(self, window=7, days=None):
+        """[(дата, среднее за window календарных дней по эту дату), ...] для дней с записями"""
+        ordinals = self.day_series()[0]
+        values = self.cached(('rolling', window), lambda: self._rolling(window))
+        start = 0 if days is None else len(ordinals) - min(days, len(ordinals))
+        return [
+            (datetime.date.fromordinal(int(ordinal)), float(value))
+            for ordinal, value in zip(ordinals[start:], values[start:])
+        ]
+
+    def _rolling(self, window):
+        ordinals, counts, sums = self.day_series()
+        np = self.np
+        if np:
+            lo = np.searchsorted(ordinals, ordinals - (window - 1))
+            total = np.concatenate(([0.0], np.cumsum(sums)))
+            count = np.concatenate(([0.0], np.cumsum(counts)))
+            return (total[1:] - total[lo]) / (count[1:] - count[lo])
+        values = array('d')
+        lo = 0
+        total = count = 0
+        for i, ordinal in enumerate(ordinals):
+            total += sums[i]
+            count += counts[i]
+            while ordinals[lo] <= ordinal - window:
+                total -= sums[lo]
+                count -= counts[lo]
+                lo += 1
+            values.append(total / count)
+        return values
+
+    def weekday_pattern(self):
+        """Среднее настроение по дням недели, понедельник первый (None — нет записей)"""
+        def compute():
+            ordinals, counts, sums = self.day_series()
+            np = self.np
+            if np:
+                weekdays = (ordinals + 6) % 7  # ординал 1 — понедельник
+                count = np.bincount(weekdays, weights=counts, minlength=7)
+                total = np.bincount(weekdays, weights=sums, minlength=7)
+                count, total = count.tolist(), total.tolist()
+            else:
+                count, total = [0] * 7, [0] * 7
+                for ordinal, day_count, day_sum in zip(ordinals, counts, sums):
+                    weekday = (ordinal + 6) % 7
+                    count[weekday] += day_count
+                    total[weekday] += day_sum
+            return [t / c if c else None for t, c in zip(total, count)]
+        return self.cached('weekdays', compute)
+
+    def time_of_day_pattern(self):
+        """Среднее настроение по часам местного времени (None — нет записей)"""
+        rollups = self.data_manager.rollups
+        return [
+            total / count if count else None
+            for total, count in zip(rollups.hour_sums, rollups.hour_counts)
+        ]
+
+    def streaks(self):
+        """{'current', 'longest'} — серии дней подряд хотя бы с одной записью"""
+        def compute():
+            ordinals = self.day_series()[0]
+            if not len(ordinals):
+                return {'current': 0, 'longest': 0}
+            np = self.np
+            if np:
+                breaks = np.flatnonzero(np.diff(ordinals) != 1)
+                bounds = np.concatenate(([-1], breaks, [len(ordinals) - 1]))
+                runs = np.diff(bounds)
+                longest, last_run = int(runs.max()), int(runs[-1])
+            else:
+                longest = last_run = 1
+                for previous, ordinal in zip(ordinals, ordinals[1:]):
+                    last_run = last_run + 1 if ordinal - previous == 1 else 1
+                    longest = max(longest, last_run)
+            # Серия не прервана, если последняя запись сегодня или вчера
+            alive = ordinals[-1] >= datetime.date.today().toordinal() - 1
+            return {'current': last_run if alive else 0, 'longest': longest}
+        return self.cached('streaks', compute)
+
+    def volatility(self, window=30):
+        """Разброс дневных средних: std за всё время и за window дней, средний скачок между днями"""
+        def compute():
+            ordinals = self.day_series()[0]
+            means = self.daily_means()
+            recent_from = datetime.date.today().toordinal() - window + 1
+            np = self.np
+            if np:
+                recent = means[ordinals >= recent_from]
+                return {
+                    'std': float(means.std()) if len(means) else None,
+                    'recent_std': float(recent.std()) if len(recent) else None,
+                    'mean_change': float(np.abs(np.diff(means)).mean()) if len(means) > 1 else None,
+                }
+            recent = [m for ordinal, m in zip(ordinals, means) if ordinal >= recent_from]
+            changes = [abs(b - a) for a, b in zip(means, means[1:])]
+            return {
+                'std': population_std(means),
+                'recent_std': population_std(recent),
+                'mean_change': sum(changes) / len(changes) if changes else None,
             }
+        return self.cached(('volatility', window), compute)
+
+    def correlation(self, activity):
+        """Корреляция Пирсона дневного настроения и активности (0 в дни без неё)
+
+        None, если дней меньше трёх или один из рядов постоянен.
+        """
+        def compute():
+            by_day = self.activities[activity]()
+            ordinals = self.day_series()[0]
+            means = self.daily_means()
+            np = self.np
+            if np:
+                keys = np.array(sorted(day.toordinal() for day in by_day), dtype=np.int64)
+                values = np.array([by_day[datetime.date.fromordinal(int(k))] for k in keys],
+                                  dtype=np.float64)
+                found = np.zeros(len(ordinals), dtype=np.float64)
+                if len(keys):
+                    index = np.minimum(np.searchsorted(keys, ordinals), len(keys) - 1)
+                    found = np.where(keys[index] == ordinals, values[index], 0.0)
+                if len(means) < 3 or means.std() == 0 or found.std() == 0:
+                    return None
+                return float(np.corrcoef(means, found)[0, 1])
+            by_ordinal = {day.toordinal(): value for day, value in by_day.items()}
+            found = [by_ordinal.get(ordinal, 0) for ordinal in ordinals]
+            return pearson(means, found)
+        return self.cached(('correlation', activity), compute)
+
+    def summary(self, window=7):
+        """Всё сразу — для экрана и экспорта отчёта"""
+        return {
+            'rolling': self.rolling_average(window, days=30),
+            'weekdays': self.weekday_pattern(),
+            'hours': self.time_of_day_pattern(),
+            'streaks': self.streaks(),
+            'volatility': self.volatility(),
+            'correlations': {name: self.correlation(name) for name in self.activities},
         }
-        self.current_language = 'en'
+
+class LanguageManager:
+    """Менеджер локализации для многоязычной поддержки
+
+    Каталоги лежат в locales/<код>.json; при первой загрузке каталог
+    компилируется в marshal-таблицу в cache_dir, и следующие запуски читают
+    её. В памяти держится только активный язык (и английский как запасной,
+    если он понадобился).
+    """
+    LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'locales')
+    FALLBACK = 'en'
+    
+    def __init__(self, lang_code=FALLBACK, locales_dir=None, cache_dir=None):
+        self.locales_dir = locales_dir or self.LOCALES_DIR
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.translations = {}  # загруженные каталоги: код -> {ключ: текст}
+        if not self.has_language(lang_code):
+            lang_code = self.FALLBACK
+        self.current_language = lang_code
+        self.catalog = self.load_catalog(lang_code)
+        # (id виджета, свойство) -> (weakref на виджет, ключ, аргументы format)
+        self.bindings = {}
+        
+    def available_languages(self):
+        """{код: название языка} из locales/index.json, без загрузки каталогов"""
+        try:
+            with open(os.path.join(self.locales_dir, 'index.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            from kivy.logger import Logger
+            Logger.exception('MindWell: cannot read the language index')
+            return {}
+        
+    def has_language(self, lang_code):
+        return os.path.exists(os.path.join(self.locales_dir, f'{lang_code}.json'))
+        
+    def load_catalog(self, lang_code):
+        """Каталог языка: из памяти, из marshal-кэша или из JSON (с записью кэша)"""
+        catalog = self.translations.get(lang_code)
+        if catalog is not None:
+            return catalog
+        source = os.path.join(self.locales_dir, f'{lang_code}.json')
+        compiled = None
+        if self.cache_dir:
+            compiled = os.path.join(
+                self.cache_dir, f'{lang_code}.{sys.implementation.cache_tag}.marshal'
+            )
+            try:
+                if os.path.getmtime(compiled) >= os.path.getmtime(source):
+                    with open(compiled, 'rb') as f:
+                        catalog = marshal.load(f)
+            except (OSError, EOFError, ValueError, TypeError):
+                catalog = None
+        if catalog is None:
+            try:
+                with open(source, encoding='utf-8') as f:
+                    catalog = json.load(f)
+            except (OSError, ValueError):
+                # Без каталога показываем ключи, а не роняем приложение
+                from kivy.logger import Logger
+                Logger.exception(f'MindWell: cannot load the {lang_code} catalog')
+                self.translations[lang_code] = {}
+                return {}
+            if compiled:
+                try:
+                    with open(compiled, 'wb') as f:
+                        marshal.dump(catalog, f)
+                except OSError:
+                    pass  # без кэша просто читаем JSON в следующий раз
+        self.translations[lang_code] = catalog
+        return catalog
         
     def get_text(self, key):
-        return self.translations[self.current_language].get(key, key)
+        text = self.catalog.get(key)
+        if text is None and self.current_language != self.FALLBACK:
+            text = self.load_catalog(self.FALLBACK).get(key)
+        return key if text is None else text
+        
+    def bind_text(self, widget, key, *args, attr='text'):
+        """Привязать свойство виджета к ключу перевода и сразу выставить текст
+
+        Повторный вызов для того же виджета заменяет ключ; при смене языка
+        обновляются только привязанные свойства.
+        """
+        self.bindings[(id(widget), attr)] = (weakref.ref(widget), key, args)
+        self.apply_text(widget, attr, key, args)
+        
+    def apply_text(self, widget, attr, key, args):
+        text = self.get_text(key)
+        setattr(widget, attr, text.format(*args) if args else text)
         
     def set_language(self, lang_code):
-        if lang_code in self.translations:
+        if lang_code != self.current_language and self.has_language(lang_code):
+            self.catalog = self.load_catalog(lang_code)
+            # Неактивные каталоги не держим в памяти
+            self.translations = {lang_code: self.catalog}
             self.current_language = lang_code
+            self.refresh_bindings()
+            
+    def refresh_bindings(self):
+        """Перерисовать все привязанные тексты одним проходом, убирая мёртвые виджеты"""
+        for binding_id, (ref, key, args) in list(self.bindings.items()):
+            widget = ref()
+            if widget is None:
+                del self.bindings[binding_id]
+            else:
+                self.apply_text(widget, binding_id[1], key, args)
+
+class TipLibrary:
+    """Советы по эмоциональному интеллекту из локализованных пакетов контента
+
+    Пакет — файл <каталог>/<язык>/<имя>.jsonl, по совету на строку:
+    {"category", "title", "content", "science"}. Пакеты собираются из всех
+    pack_dirs (встроенный locales/tips и скачанные в user_data_dir), так что
+    новый пакет подключается без правки кода; если для языка пакетов нет,
+    берутся английские.
+
+    При смене языка строится только индекс — смещения строк и номера советов
+    по категориям (кэшируется marshal-таблицей, как каталоги переводов).
+    Тексты читаются страницами по PAGE_SIZE, в памяти держатся только
+    страницы текущего и соседних советов.
+    """
+    TIPS_DIR = os.path.join(LanguageManager.LOCALES_DIR, 'tips')
+    FALLBACK = LanguageManager.FALLBACK
+    PAGE_SIZE = 20
+    
+    def __init__(self, language=FALLBACK, pack_dirs=None, cache_dir=None):
+        self.pack_dirs = pack_dirs or [self.TIPS_DIR]
+        self.cache_dir = cache_dir
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+        self.language = None
+        self.category = None
+        self.set_language(language)
+        
+    def pack_files(self, language):
+        files = []
+        for pack_dir in self.pack_dirs:
+            lang_dir = os.path.join(pack_dir, language)
+            try:
+                names = sorted(os.listdir(lang_dir))
+            except OSError:
+                continue
+            files.extend(os.path.join(lang_dir, name) for name in names if name.endswith('.jsonl'))
+        return files
+        
+    def set_language(self, language):
+        """Переключить язык; True, если выборка советов поменялась"""
+        if language == self.language:
+            return False
+        files = self.pack_files(language)
+        if not files and language != self.FALLBACK:
+            files = self.pack_files(self.FALLBACK)
+        self.language = language
+        self.files = files
+        self.file_ids, self.offsets, self.categories = self.load_index(language, files)
+        self.select(self.category)
+        return True
+        
+    def load_index(self, language, files):
+        """Индекс пакетов: из marshal-кэша, если файлы не менялись, иначе сканированием"""
+        signature = [(path, os.path.getmtime(path), os.path.getsize(path)) for path in files]
+        compiled = None
+        if self.cache_dir:
+            compiled = os.path.join(
+                self.cache_dir, f'tips-{language}.{sys.implementation.cache_tag}.marshal'
+            )
+            try:
+                with open(compiled, 'rb') as f:
+                    cached = marshal.load(f)
+                if cached[0] == signature:
+                    return (array('H', cached[1]), array('q', cached[2]),
+                            {name: array('I', ids) for name, ids in cached[3].items()})
+            except (OSError, EOFError, ValueError, TypeError, IndexError):
+                pass
+        file_ids, offsets, categories = array('H'), array('q'), {}
+        for file_id, path in enumerate(files):
+            offset = 0
+            with open(path, 'rb') as f:
+                for line in f:
+                    try:
+                        tip = json.loads(line)
+                    except ValueError:
+                        tip = None  # пустая или битая строка пакета
+                    if isinstance(tip, dict):
+                        categories.setdefault(tip.get('category', ''), array('I')).append(len(offsets))
+                        file_ids.append(file_id)
+                        offsets.append(offset)
+                    offset += len(line)
+        if compiled:
+            try:
+                with open(compiled, 'wb') as f:
+                    marshal.dump((signature, file_ids.tobytes(), offsets.tobytes(),
+                                  {name: ids.tobytes() for name, ids in categories.items()}), f)
+            except OSError:
+                pass
+        return file_ids, offsets, categories
+        
+    def select(self, category=None):
+        """Листать только категорию (None или неизвестная — все советы)"""
+        if category not in self.categories:
+            category = None
+        self.category = category
+        self.view = range(len(self.offsets)) if category is None else self.categories[category]
+        self.pages = {}  # номер страницы -> список советов
+        
+    def __len__(self):
+        return len(self.view)
+        
+    def get(self, index):
+        """Совет по номеру в выборке; страница читается с диска при промахе"""
+        page, position = divmod(index, self.PAGE_SIZE)
+        tips = self.pages.get(page)
+        if tips is None:
+            tips = self.load_page(page)
+        return tips[position]
+        
+    def load_page(self, page):
+        start = page * self.PAGE_SIZE
+        handles = {}
+        tips = []
+        try:
+            for entry in self.view[start:start + self.PAGE_SIZE]:
+                file_id = self.file_ids[entry]
+                f = handles.get(file_id)
+                if f is None:
+                    f = handles[file_id] = open(self.files[file_id], 'rb')
+                f.seek(self.offsets[entry])
+                tips.append(json.loads(f.readline()))
+        finally:
+            for f in handles.values():
+                f.close()
+        self.pages[page] = tips
+        return tips
+        
+    def prefetch(self, index):
+        """Подгрузить страницы соседних советов (с переходом по кругу) и выгрузить остальные"""
+        count = len(self.view)
+        if not count:
+            return
+        wanted = {(index + step) % count // self.PAGE_SIZE for step in (-1, 0, 1)}
+        for page in list(self.pages):
+            if page not in wanted:
+                del self.pages[page]
+        for page in wanted:
+            if page not in self.pages:
+                self.load_page(page)
 
 class MainScreen(Screen):
     """Главный экран с основными функциями"""
@@ -221,6 +1942,10 @@ class MainScreen(Screen):
         self.build_ui()
         
     def build_ui(self):
+        # Фон экрана, карточек и кнопок — общий рендерер
+        self.backgrounds = BackgroundRenderer(self)
+        self.backgrounds.add(self, 'screen')
+        
         # Основной контейнер
         main_layout = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(15))
         
@@ -257,6 +1982,7 @@ class MainScreen(Screen):
         bottom_nav = BoxLayout(size_hint_y=0.1, spacing=dp(10))
         
         settings_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='⚙️',
             font_size='20sp',
             size_hint_x=0.2
@@ -270,60 +1996,64 @@ class MainScreen(Screen):
         main_layout.add_widget(cards_grid)
         main_layout.add_widget(bottom_nav)
         
-        # Фон с градиентом
-        with self.canvas.before:
-            Color(0.05, 0.05, 0.1, 1)  # Тёмно-синий фон
-            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_bg, size=self.update_bg)
-        
         self.add_widget(main_layout)
         
-    def update_bg(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
+    def on_pre_enter(self, *args):
+        # Обновляем график и итоги медитации после возврата с других экранов
+        self.refresh_chart()
+        self.refresh_meditation_stats()
+        
+    def refresh_chart(self, days=7):
+        data_manager = self.app.data_manager
+        self.mood_chart.set_data(
+            data_manager.get_recent_moods(days),
+            cache_key=(days, data_manager.revision)
+        )
         
     def create_mood_card(self):
         """Создание карточки трекера настроения"""
         card_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
         
         # Glassmorphic панель
-        panel = GlassmorphicPanel()
+        panel = GlassmorphicPanel(renderer=self.backgrounds)
         
         # Заголовок
         title = Label(
-            text=self.app.lang_manager.get_text('mood_tracker'),
             font_size='18sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.3,
             halign='center'
         )
+        self.app.lang_manager.bind_text(title, 'mood_tracker')
         title.bind(size=title.setter('text_size'))
         
-        # График настроения
-        chart = MoodChart(size_hint_y=0.4)
+        # График настроения (средние по дням из агрегатов DataManager)
+        self.mood_chart = MoodChart(size_hint_y=0.4)
+        self.refresh_chart()
         
         # Описание
         desc = Label(
-            text=self.app.lang_manager.get_text('track_mood'),
             font_size='12sp',
             color=[0.8, 0.8, 0.8, 1],
             size_hint_y=0.3,
             halign='center',
             valign='middle'
         )
+        self.app.lang_manager.bind_text(desc, 'track_mood')
         desc.bind(size=desc.setter('text_size'))
         
         # Кнопка
         track_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('track_button'),
+            renderer=self.backgrounds,
             size_hint_y=0.2,
             font_size='14sp',
             color=[1, 0.4, 0.8, 1]  # Неоновый розовый
         )
+        self.app.lang_manager.bind_text(track_btn, 'track_button')
         track_btn.bind(on_press=lambda x: self.open_mood_tracker())
         
         card_layout.add_widget(title)
-        card_layout.add_widget(chart)
+        card_layout.add_widget(self.mood_chart)
         card_layout.add_widget(desc)
         card_layout.add_widget(track_btn)
         
@@ -331,47 +2061,65 @@ class MainScreen(Screen):
         panel.add_widget(card_layout)
         return panel
         
+    def refresh_meditation_stats(self):
+        """Минуты за сегодня и серия дней — из счётчиков журнала, без запросов"""
+        log = self.app.data_manager.meditation_log
+        self.app.lang_manager.bind_text(
+            self.meditation_stats, 'meditation_stats',
+            round(log.minutes_on(datetime.date.today())), log.current_streak()
+        )
+        
     def create_meditation_card(self):
         """Создание карточки медитации"""
         card_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
         
-        panel = GlassmorphicPanel()
+        panel = GlassmorphicPanel(renderer=self.backgrounds)
         
         # Иконка медитации
         icon = Label(
             text='🧘‍♀️',
             font_size='40sp',
-            size_hint_y=0.4
+            size_hint_y=0.3
         )
         
         title = Label(
-            text=self.app.lang_manager.get_text('meditate'),
             font_size='18sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.2
         )
+        self.app.lang_manager.bind_text(title, 'meditate')
         
         desc = Label(
-            text=self.app.lang_manager.get_text('meditation_benefit'),
             font_size='11sp',
             color=[0.8, 0.8, 0.8, 1],
             size_hint_y=0.3,
             halign='center',
             valign='middle'
         )
+        self.app.lang_manager.bind_text(desc, 'meditation_benefit')
         desc.bind(size=desc.setter('text_size'))
         
+        # Итоги: минуты за сегодня и серия дней
+        self.meditation_stats = Label(
+            font_size='11sp',
+            color=[0.4, 0.8, 1, 1],
+            size_hint_y=0.1
+        )
+        self.refresh_meditation_stats()
+        
         start_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('start_button'),
+            renderer=self.backgrounds,
             size_hint_y=0.2,
             font_size='14sp',
             color=[0.4, 0.8, 1, 1]  # Неоновый синий
         )
+        self.app.lang_manager.bind_text(start_btn, 'start_button')
         start_btn.bind(on_press=lambda x: self.start_meditation())
         
         card_layout.add_widget(icon)
         card_layout.add_widget(title)
         card_layout.add_widget(desc)
+        card_layout.add_widget(self.meditation_stats)
         card_layout.add_widget(start_btn)
         
         panel.add_widget(card_layout)
@@ -381,7 +2129,7 @@ class MainScreen(Screen):
         """Создание карточки концентрации"""
         card_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
         
-        panel = GlassmorphicPanel()
+        panel = GlassmorphicPanel(renderer=self.backgrounds)
         
         # Иконка мозга
         icon = Label(
@@ -392,28 +2140,29 @@ class MainScreen(Screen):
         )
         
         title = Label(
-            text=self.app.lang_manager.get_text('concentration'),
             font_size='16sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.2
         )
+        self.app.lang_manager.bind_text(title, 'concentration')
         
         desc = Label(
-            text=self.app.lang_manager.get_text('concentration_desc'),
             font_size='11sp',
             color=[0.8, 0.8, 0.8, 1],
             size_hint_y=0.3,
             halign='center',
             valign='middle'
         )
+        self.app.lang_manager.bind_text(desc, 'concentration_desc')
         desc.bind(size=desc.setter('text_size'))
         
         start_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('start_button'),
+            renderer=self.backgrounds,
             size_hint_y=0.2,
             font_size='14sp',
             color=[0.8, 0.4, 1, 1]
         )
+        self.app.lang_manager.bind_text(start_btn, 'start_button')
         start_btn.bind(on_press=lambda x: self.start_concentration())
         
         card_layout.add_widget(icon)
@@ -428,7 +2177,7 @@ class MainScreen(Screen):
         """Создание карточки эмоционального интеллекта"""
         card_layout = BoxLayout(orientation='vertical', padding=dp(15), spacing=dp(10))
         
-        panel = GlassmorphicPanel()
+        panel = GlassmorphicPanel(renderer=self.backgrounds)
         
         # Иконка лампочки
         icon = Label(
@@ -439,30 +2188,31 @@ class MainScreen(Screen):
         )
         
         title = Label(
-            text=self.app.lang_manager.get_text('emotional_intelligence'),
             font_size='14sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.2,
             halign='center'
         )
+        self.app.lang_manager.bind_text(title, 'emotional_intelligence')
         title.bind(size=title.setter('text_size'))
         
         desc = Label(
-            text=self.app.lang_manager.get_text('ei_desc'),
             font_size='11sp',
             color=[0.8, 0.8, 0.8, 1],
             size_hint_y=0.3,
             halign='center',
             valign='middle'
         )
+        self.app.lang_manager.bind_text(desc, 'ei_desc')
         desc.bind(size=desc.setter('text_size'))
         
         start_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('start_button'),
+            renderer=self.backgrounds,
             size_hint_y=0.2,
             font_size='14sp',
             color=[1, 0.8, 0.2, 1]
         )
+        self.app.lang_manager.bind_text(start_btn, 'start_button')
         start_btn.bind(on_press=lambda x: self.show_ei_tips())
         
         card_layout.add_widget(icon)
@@ -475,54 +2225,53 @@ class MainScreen(Screen):
         
     def open_mood_tracker(self):
         """Открыть трекер настроения"""
-        self.app.root.transition = SlideTransition(direction='left')
-        self.app.root.current = 'mood'
+        self.app.router.go('mood')
         
     def start_meditation(self):
         """Запустить медитацию"""
-        self.app.root.transition = SlideTransition(direction='left')
-        self.app.root.current = 'meditation'
+        self.app.router.go('meditation')
         
     def start_concentration(self):
         """Запустить упражнения на концентрацию"""
-        self.app.root.transition = SlideTransition(direction='left')
-        self.app.root.current = 'concentration'
+        self.app.router.go('concentration')
         
     def show_ei_tips(self):
         """Показать советы по эмоциональному интеллекту"""
-        self.app.root.transition = SlideTransition(direction='left')
-        self.app.root.current = 'ei'
+        self.app.router.go('ei')
         
     def show_settings(self):
         """Показать настройки"""
+        from kivy.uix.popup import Popup
+        
         # Создание всплывающего окна настроек
         content = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(10))
         
         title = Label(
-            text=self.app.lang_manager.get_text('settings'),
             font_size='20sp',
             size_hint_y=0.2
         )
+        self.app.lang_manager.bind_text(title, 'settings')
         
         lang_label = Label(
-            text=self.app.lang_manager.get_text('language'),
             font_size='16sp',
             size_hint_y=0.2
         )
+        self.app.lang_manager.bind_text(lang_label, 'language')
         
-        lang_buttons = BoxLayout(spacing=dp(10), size_hint_y=0.3)
-        
-        en_btn = NeumorphicButton(text='English', font_size='14sp')
-        ru_btn = NeumorphicButton(text='Русский', font_size='14sp')
-        zh_btn = NeumorphicButton(text='中文', font_size='14sp')
+        lang_buttons = GridLayout(cols=3, spacing=dp(10), size_hint_y=0.3)
         
-        en_btn.bind(on_press=lambda x: self.change_language('en'))
-        ru_btn.bind(on_press=lambda x: self.change_language('ru'))
-        zh_btn.bind(on_press=lambda x: self.change_language('zh'))
+        for lang_code, lang_name in self.app.lang_manager.available_languages().items():
+            lang_btn = NeumorphicButton(text=lang_name, font_size='14sp')
+            lang_btn.bind(on_press=lambda x, code=lang_code: self.change_language(code))
+            lang_buttons.add_widget(lang_btn)
         
-        lang_buttons.add_widget(en_btn)
-        lang_buttons.add_widget(ru_btn)
-        lang_buttons.add_widget(zh_btn)
+        debug_btn = NeumorphicButton(
+            size_hint_y=0.2,
+            font_size='14sp',
+            color=[0.6, 1, 0.6, 1]
+        )
+        self.app.lang_manager.bind_text(debug_btn, 'debug_overlay')
+        debug_btn.bind(on_press=lambda x: self.app.instrumentation.toggle())
         
         close_btn = NeumorphicButton(
             text='Close',
@@ -533,12 +2282,13 @@ class MainScreen(Screen):
         content.add_widget(title)
         content.add_widget(lang_label)
         content.add_widget(lang_buttons)
+        content.add_widget(debug_btn)
         content.add_widget(close_btn)
         
         popup = Popup(
             title='',
             content=content,
-            size_hint=(0.8, 0.6),
+            size_hint=(0.8, 0.7),
             background_color=[0.1, 0.1, 0.15, 0.95]
         )
         
@@ -547,34 +2297,52 @@ class MainScreen(Screen):
         
     def change_language(self, lang_code):
         """Изменить язык приложения"""
+        # Привязанные подписи на всех экранах обновятся сразу
         self.app.lang_manager.set_language(lang_code)
-        # Здесь можно добавить обновление интерфейса
+        self.app.data_manager.set_value('language', lang_code)
         
 class MoodScreen(Screen):
     """Экран трекера настроения"""
+    EMOJIS = ['😢', '😟', '😐', '😊', '😄']
+    COLORS = [
+        [1, 0.3, 0.3, 1],    # Красный
+        [1, 0.6, 0.3, 1],    # Оранжевый
+        [1, 1, 0.3, 1],      # Жёлтый
+        [0.3, 1, 0.6, 1],    # Зелёный
+        [0.3, 0.8, 1, 1]     # Синий
+    ]
+    
     def __init__(self, app, **kwargs):
         super().__init__(name='mood', **kwargs)
         self.app = app
         self.mood_value = 3
+        # События слайдера сливаются: индикатор обновляется не чаще раза за кадр
+        self.mood_trigger = Clock.create_trigger(self.apply_mood_change)
         self.build_ui()
         
     def build_ui(self):
+        from kivy.uix.slider import Slider
+        
+        # Фон экрана, карточек и кнопок — общий рендерер
+        self.backgrounds = BackgroundRenderer(self)
+        self.backgrounds.add(self, 'screen')
+        
         layout = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(20))
         
         # Заголовок
         title = Label(
-            text=self.app.lang_manager.get_text('how_feeling'),
             font_size='24sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.2
         )
+        self.app.lang_manager.bind_text(title, 'how_feeling')
         
         # Слайдер настроения
-        mood_slider = Slider(
+        self.mood_slider = Slider(
             min=1, max=5, value=3, step=1,
             size_hint_y=0.1
         )
-        mood_slider.bind(value=self.on_mood_change)
+        self.mood_slider.bind(value=self.on_mood_change)
         
         # Текстовые метки настроения
         mood_labels = BoxLayout(size_hint_y=0.1)
@@ -582,14 +2350,14 @@ class MoodScreen(Screen):
         
         for label_key in labels_text:
             label = Label(
-                text=self.app.lang_manager.get_text(label_key),
                 font_size='12sp',
                 color=[0.8, 0.8, 0.8, 1]
             )
+            self.app.lang_manager.bind_text(label, label_key)
             mood_labels.add_widget(label)
         
         # Индикатор настроения
-        self.mood_indicator = Label(
+        self.mood_indicator = MoodIndicator(
             text='😐',
             font_size='80sp',
             size_hint_y=0.3
@@ -599,6 +2367,7 @@ class MoodScreen(Screen):
         buttons = BoxLayout(size_hint_y=0.2, spacing=dp(10))
         
         back_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='←',
             font_size='20sp',
             size_hint_x=0.3
@@ -606,10 +2375,11 @@ class MoodScreen(Screen):
         back_btn.bind(on_press=self.go_back)
         
         save_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('save_mood'),
+            renderer=self.backgrounds,
             font_size='16sp',
             color=[0.4, 1, 0.4, 1]  # Зелёный
         )
+        self.app.lang_manager.bind_text(save_btn, 'save_mood')
         save_btn.bind(on_press=self.save_mood)
         
         buttons.add_widget(back_btn)
@@ -617,43 +2387,28 @@ class MoodScreen(Screen):
         
         layout.add_widget(title)
         layout.add_widget(self.mood_indicator)
-        layout.add_widget(mood_slider)
+        layout.add_widget(self.mood_slider)
         layout.add_widget(mood_labels)
         layout.add_widget(buttons)
         
-        # Фон
-        with self.canvas.before:
-            Color(0.05, 0.05, 0.1, 1)
-            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_bg, size=self.update_bg)
-        
         self.add_widget(layout)
         
-    def update_bg(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
-        
     def on_mood_change(self, instance, value):
-        """Обработка изменения настроения"""
+        """Обработка изменения настроения: только запоминаем значение"""
         self.mood_value = int(value)
-        emojis = ['😢', '😟', '😐', '😊', '😄']
-        colors = [
-            [1, 0.3, 0.3, 1],    # Красный
-            [1, 0.6, 0.3, 1],    # Оранжевый
-            [1, 1, 0.3, 1],      # Жёлтый
-            [0.3, 1, 0.6, 1],    # Зелёный
-            [0.3, 0.8, 1, 1]     # Синий
-        ]
+        self.mood_trigger()
         
-        self.mood_indicator.text = emojis[self.mood_value - 1]
-        self.mood_indicator.color = colors[self.mood_value - 1]
+    def apply_mood_change(self, dt):
+        """Обновить индикатор один раз за кадр"""
+        self.mood_indicator.show(self.EMOJIS[self.mood_value - 1], self.COLORS[self.mood_value - 1])
         
-        # Анимация изменения размера
-        anim = Animation(font_size='100sp', duration=0.1) + Animation(font_size='80sp', duration=0.1)
-        anim.start(self.mood_indicator)
+        # Пульс масштабом поверх готовой текстуры
+        self.mood_indicator.pulse()
         
     def save_mood(self, instance):
         """Сохранить настроение"""
+        from kivy.uix.popup import Popup
+        
         self.app.data_manager.save_mood(self.mood_value)
         
         # Показать подтверждение
@@ -672,30 +2427,54 @@ class MoodScreen(Screen):
         
     def go_back(self, instance):
         """Вернуться на главный экран"""
-        self.app.root.transition = SlideTransition(direction='right')
-        self.app.root.current = 'main'
+        self.app.router.back()
 
 class MeditationScreen(Screen):
-    """Экран медитации"""
+    """Экран медитации
+
+    Сессией управляет один драйвер: фаза дыхания и таймер вычисляются из
+    монотонного времени с начала сессии, а драйвер перепланирует себя на
+    ближайшую границу фазы или секунды. Поэтому за час сессии ничего не
+    накапливается и не дрейфует.
+    """
+    # Цикл дыхания: 4 секунды вдох, 2 секунды задержка, 6 секунд выдох, 2 секунды задержка
+    PHASE_TIMES = [4, 2, 6, 2]
+    CYCLE_TIME = sum(PHASE_TIMES)
+    PHASE_INSTRUCTIONS = ['breathe_in', 'hold', 'breathe_out', 'hold']
+    PHASE_COLORS = [
+        [0.4, 0.8, 1, 1],    # Синий для вдоха
+        [0.8, 0.8, 1, 1],    # Светло-синий для задержки
+        [0.4, 1, 0.8, 1],    # Зелёный для выдоха
+        [0.8, 1, 0.8, 1]     # Светло-зелёный для задержки
+    ]
+    CIRCLE_SIZES = [250, 250, 150, 150]  # Размеры круга
+    
     def __init__(self, app, **kwargs):
         super().__init__(name='meditation', **kwargs)
         self.app = app
         self.meditation_active = False
         self.breath_phase = 0  # 0: вдох, 1: задержка, 2: выдох, 3: задержка
-        self.breath_timer = None
+        self.phase_count = -1  # номер текущей фазы с начала сессии
+        self.driver_event = None
+        self.session_start = 0
         self.session_time = 0
+        self.completed_cycles = 0
         self.build_ui()
         
     def build_ui(self):
+        # Фон экрана, карточек и кнопок — общий рендерер
+        self.backgrounds = BackgroundRenderer(self)
+        self.backgrounds.add(self, 'screen')
+        
         layout = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(20))
         
         # Заголовок
         title = Label(
-            text=self.app.lang_manager.get_text('meditation_timer'),
             font_size='24sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.15
         )
+        self.app.lang_manager.bind_text(title, 'meditation_timer')
         
         # Дыхательный круг
         self.breathing_circle = Widget(size_hint_y=0.5)
@@ -706,11 +2485,11 @@ class MeditationScreen(Screen):
         
         # Инструкция по дыханию
         self.breath_instruction = Label(
-            text=self.app.lang_manager.get_text('breathe_in'),
             font_size='20sp',
             color=[0.4, 0.8, 1, 1],
             size_hint_y=0.1
         )
+        self.app.lang_manager.bind_text(self.breath_instruction, 'breathe_in')
         
         # Таймер сессии
         self.session_timer = Label(
@@ -724,6 +2503,7 @@ class MeditationScreen(Screen):
         controls = BoxLayout(size_hint_y=0.15, spacing=dp(10))
         
         back_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='←',
             font_size='20sp',
             size_hint_x=0.3
@@ -731,10 +2511,11 @@ class MeditationScreen(Screen):
         back_btn.bind(on_press=self.go_back)
         
         self.meditation_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('start_button'),
+            renderer=self.backgrounds,
             font_size='16sp',
             color=[0.4, 1, 0.4, 1]
         )
+        self.app.lang_manager.bind_text(self.meditation_btn, 'start_button')
         self.meditation_btn.bind(on_press=self.toggle_meditation)
         
         controls.add_widget(back_btn)
@@ -746,18 +2527,8 @@ class MeditationScreen(Screen):
         layout.add_widget(self.session_timer)
         layout.add_widget(controls)
         
-        # Фон с градиентом
-        with self.canvas.before:
-            Color(0.05, 0.05, 0.1, 1)
-            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_bg, size=self.update_bg)
-        
         self.add_widget(layout)
         
-    def update_bg(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
-        
     def update_circle(self, *args):
         center_x = self.breathing_circle.center_x - 100
         center_y = self.breathing_circle.center_y - 100
@@ -773,84 +2544,99 @@ class MeditationScreen(Screen):
     def start_meditation(self):
         """Начать сессию медитации"""
         self.meditation_active = True
+        self.session_start = time.perf_counter()
+        self.session_started_at = time.time()  # для журнала сессий
         self.session_time = 0
+        self.completed_cycles = 0
         self.breath_phase = 0
-        self.meditation_btn.text = 'Stop'
+        self.phase_count = -1
+        self.session_timer.text = '00:00'
+        self.app.lang_manager.bind_text(self.meditation_btn, 'stop_button')
         self.meditation_btn.color = [1, 0.4, 0.4, 1]  # Красный
         
-        # Запуск дыхательного цикла и таймера
-        self.breath_timer = Clock.schedule_interval(self.breath_cycle, 1)
-        Clock.schedule_interval(self.update_session_timer, 1)
+        # Один драйвер для фаз дыхания и таймера
+        self.drive_session(0)
         
     def stop_meditation(self):
         """Остановить медитацию"""
         self.meditation_active = False
-        if self.breath_timer:
-            self.breath_timer.cancel()
-        self.meditation_btn.text = self.app.lang_manager.get_text('start_button')
+        if self.driver_event is not None:
+            self.driver_event.cancel()
+            self.driver_event = None
+        Animation.cancel_all(self.circle)
+        self.app.lang_manager.bind_text(self.meditation_btn, 'start_button')
         self.meditation_btn.color = [0.4, 1, 0.4, 1]  # Зелёный
         
-        # Показать результат
-        if self.session_time > 0:
+        # Сохранить сессию и показать результат (таймер мог не дойти до последней секунды)
+        duration = time.perf_counter() - self.session_start
+        if duration >= 1:
+            self.update_session_timer(int(duration))
+            self.completed_cycles = int(duration // self.CYCLE_TIME)
+            self.app.data_manager.add_meditation_session(
+                self.session_started_at, duration, self.completed_cycles
+            )
             self.show_completion_popup()
             
-    def breath_cycle(self, dt):
-        """Цикл дыхания: 4 секунды вдох, 2 секунды задержка, 6 секунд выдох, 2 секунды задержка"""
-        cycle_times = [4, 2, 6, 2]  # Время для каждой фазы
-        instructions = ['breathe_in', 'hold', 'breathe_out', 'hold']
-        colors = [
-            [0.4, 0.8, 1, 1],    # Синий для вдоха
-            [0.8, 0.8, 1, 1],    # Светло-синий для задержки
-            [0.4, 1, 0.8, 1],    # Зелёный для выдоха
-            [0.8, 1, 0.8, 1]     # Светло-зелёный для задержки
-        ]
-        circle_sizes = [250, 250, 150, 150]  # Размеры круга
+    def drive_session(self, dt):
+        """Обновить фазу и таймер по прошедшему времени и запланировать следующий шаг"""
+        if not self.meditation_active:
+            return
+        elapsed = time.perf_counter() - self.session_start
+        cycles, in_cycle = divmod(elapsed, self.CYCLE_TIME)
+        phase, phase_end = 0, self.PHASE_TIMES[0]
+        while in_cycle >= phase_end:
+            phase += 1
+            phase_end += self.PHASE_TIMES[phase]
+        phase_count = int(cycles) * 4 + phase
+        if phase_count != self.phase_count:
+            self.phase_count = phase_count
+            self.completed_cycles = int(cycles)
+            self.breath_cycle(phase, phase_end - in_cycle)
+            
+        seconds = int(elapsed)
+        if seconds != self.session_time:
+            self.update_session_timer(seconds)
+            
+        # Просыпаемся на ближайшей границе фазы или целой секунды
+        delay = min(phase_end - in_cycle, seconds + 1 - elapsed)
+        self.driver_event = Clock.schedule_once(self.drive_session, max(delay, 0))
+        
+    def breath_cycle(self, phase, remaining):
+        """Начать фазу дыхания: одна анимация круга на оставшееся время фазы"""
+        self.breath_phase = phase
         
         # Обновляем инструкцию и цвет
-        self.breath_instruction.text = self.app.lang_manager.get_text(instructions[self.breath_phase])
-        self.breath_instruction.color = colors[self.breath_phase]
+        self.app.lang_manager.bind_text(self.breath_instruction, self.PHASE_INSTRUCTIONS[phase])
+        self.breath_instruction.color = self.PHASE_COLORS[phase]
         
         # Анимация круга
-        target_size = circle_sizes[self.breath_phase]
-        anim = Animation(
-            size=(target_size, target_size),
-            duration=cycle_times[self.breath_phase]
-        )
-        anim.start(self.circle)
-        
-        # Переход к следующей фазе
-        Clock.schedule_once(
-            lambda dt: self.next_breath_phase(),
-            cycle_times[self.breath_phase]
-        )
+        target_size = self.CIRCLE_SIZES[phase]
+        Animation.cancel_all(self.circle)
+        Animation(size=(target_size, target_size), duration=remaining).start(self.circle)
         
-    def next_breath_phase(self):
-        """Переход к следующей фазе дыхания"""
-        self.breath_phase = (self.breath_phase + 1) % 4
-        
-    def update_session_timer(self, dt):
+    def update_session_timer(self, seconds):
         """Обновление таймера сессии"""
-        if self.meditation_active:
-            self.session_time += 1
-            minutes = self.session_time // 60
-            seconds = self.session_time % 60
-            self.session_timer.text = f'{minutes:02d}:{seconds:02d}'
+        self.session_time = seconds
+        minutes = seconds // 60
+        self.session_timer.text = f'{minutes:02d}:{seconds % 60:02d}'
             
     def show_completion_popup(self):
         """Показать окно завершения сессии"""
+        from kivy.uix.popup import Popup
+        
         content = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(10))
         
         congrats = Label(
-            text=self.app.lang_manager.get_text('well_done'),
             font_size='24sp',
             color=[0.4, 1, 0.4, 1]
         )
+        self.app.lang_manager.bind_text(congrats, 'well_done')
         
         message = Label(
-            text=self.app.lang_manager.get_text('session_complete'),
             font_size='16sp',
             halign='center'
         )
+        self.app.lang_manager.bind_text(message, 'session_complete')
         message.bind(size=message.setter('text_size'))
         
         time_label = Label(
@@ -880,45 +2666,116 @@ class MeditationScreen(Screen):
         close_btn.bind(on_press=popup.dismiss)
         popup.open()
         
-        # Сохранить данные о сессии
-        self.app.data_manager.data['meditation_sessions'] += 1
-        
     def go_back(self, instance):
         """Вернуться на главный экран"""
         if self.meditation_active:
             self.stop_meditation()
-        self.app.root.transition = SlideTransition(direction='right')
-        self.app.root.current = 'main'
+        self.app.router.back()
+
+class ReactionStats:
+    """Потоковая статистика времени реакции
+
+    Значения раскладываются по корзинам фиксированной ширины, поэтому
+    медиана, p90 и гистограмма считаются за O(корзин) без сортировки истории.
+    """
+    BIN_MS = 10
+    MAX_MS = 2000  # всё медленнее попадает в последнюю корзину
+
+    def __init__(self):
+        self.bins = [0] * (self.MAX_MS // self.BIN_MS + 1)
+        self.count = 0
+        self.misses = 0
+        self.total = 0.0
+        self.best = None
+
+    def add(self, reaction_ms):
+        index = min(int(reaction_ms // self.BIN_MS), len(self.bins) - 1)
+        self.bins[index] += 1
+        self.count += 1
+        self.total += reaction_ms
+        if self.best is None or reaction_ms < self.best:
+            self.best = reaction_ms
+
+    def add_miss(self):
+        self.misses += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def quantile(self, q):
+        """Квантиль с линейной интерполяцией внутри корзины"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, amount in enumerate(self.bins):
+            if amount and seen + amount >= rank:
+                return (index + (rank - seen) / amount) * self.BIN_MS
+            seen += amount
+        return self.MAX_MS
+
+    @property
+    def median(self):
+        return self.quantile(0.5)
+
+    @property
+    def p90(self):
+        return self.quantile(0.9)
+
+    def histogram(self):
+        """Непустые корзины: [(нижняя граница, мс, количество), ...]"""
+        return [(index * self.BIN_MS, amount) for index, amount in enumerate(self.bins) if amount]
 
 class ConcentrationScreen(Screen):
-    """Экран упражнений на концентрацию"""
+    """Экран упражнений на концентрацию
+
+    Игра — конечный автомат: idle -> waiting (красный круг, ждём случайную
+    задержку) -> armed (зелёный, ждём нажатия) -> cooldown (анимация успеха)
+    -> waiting ... Круг — одна пара Color/Ellipse, меняется только цвет.
+    """
+    IDLE = 'idle'
+    WAITING = 'waiting'
+    ARMED = 'armed'
+    COOLDOWN = 'cooldown'
+    RED = (1, 0.4, 0.4, 1)
+    GREEN = (0.4, 1, 0.4, 1)
+    COOLDOWN_TIME = 0.2  # длительность анимации успеха
+    
     def __init__(self, app, **kwargs):
         super().__init__(name='concentration', **kwargs)
         self.app = app
-        self.game_active = False
-        self.reaction_start_time = 0
+        self.state = self.IDLE
+        self.pending_event = None  # единственное запланированное событие автомата
+        self.armed_time = None      # perf_counter() момента, когда зелёный кадр показан; None — ещё не показан
+        self.session_stats = ReactionStats()
+        self.session_started = 0
         self.score = 0
         self.rounds = 0
         self.build_ui()
         
     def build_ui(self):
+        # Фон экрана, карточек и кнопок — общий рендерер
+        self.backgrounds = BackgroundRenderer(self)
+        self.backgrounds.add(self, 'screen')
+        
         layout = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(20))
         
         # Заголовок
         title = Label(
-            text=self.app.lang_manager.get_text('concentration_game'),
             font_size='22sp',
             color=[1, 1, 1, 1],
             size_hint_y=0.15
         )
+        self.app.lang_manager.bind_text(title, 'concentration_game')
         
         # Игровая область
-        game_area = Widget(size_hint_y=0.5)
+        game_area = Widget(size_hint_y=0.42)
         
         # Круг для игры
         self.game_circle = Widget(size_hint=(0.3, 0.3))
         with self.game_circle.canvas:
-            Color(1, 0.4, 0.4, 1)  # Красный по умолчанию
+            self.circle_color = Color(*self.RED)  # Красный по умолчанию
             self.circle_shape = Ellipse(size=(100, 100), pos=(0, 0))
         
         self.game_circle.bind(on_touch_down=self.on_circle_touch)
@@ -935,12 +2792,12 @@ class ConcentrationScreen(Screen):
         
         # Инструкция
         self.instruction = Label(
-            text=self.app.lang_manager.get_text('focus_circle'),
             font_size='16sp',
             color=[0.8, 0.8, 0.8, 1],
             size_hint_y=0.15,
             halign='center'
         )
+        self.app.lang_manager.bind_text(self.instruction, 'focus_circle')
         self.instruction.bind(size=self.instruction.setter('text_size'))
         
         # Статистика
@@ -953,18 +2810,27 @@ class ConcentrationScreen(Screen):
         )
         
         self.reaction_label = Label(
-            text=self.app.lang_manager.get_text('reaction_time').format(0),
             font_size='16sp',
             color=[0.4, 0.8, 1, 1]
         )
+        self.app.lang_manager.bind_text(self.reaction_label, 'reaction_time', 0)
         
         stats.add_widget(self.score_label)
         stats.add_widget(self.reaction_label)
         
+        # Личный рекорд и среднее за сегодня — из счётчиков ConcentrationLog
+        self.records_label = Label(
+            font_size='13sp',
+            color=[1, 0.8, 0.2, 1],
+            size_hint_y=0.08
+        )
+        self.refresh_records()
+        
         # Кнопки
         controls = BoxLayout(size_hint_y=0.1, spacing=dp(10))
         
         back_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='←',
             font_size='20sp',
             size_hint_x=0.3
@@ -972,10 +2838,11 @@ class ConcentrationScreen(Screen):
         back_btn.bind(on_press=self.go_back)
         
         self.start_btn = NeumorphicButton(
-            text=self.app.lang_manager.get_text('start_button'),
+            renderer=self.backgrounds,
             font_size='16sp',
             color=[0.8, 0.4, 1, 1]  # Фиолетовый
         )
+        self.app.lang_manager.bind_text(self.start_btn, 'start_button')
         self.start_btn.bind(on_press=self.start_game)
         
         controls.add_widget(back_btn)
@@ -985,27 +2852,52 @@ class ConcentrationScreen(Screen):
         layout.add_widget(game_area)
         layout.add_widget(self.instruction)
         layout.add_widget(stats)
+        layout.add_widget(self.records_label)
         layout.add_widget(controls)
         
-        # Фон
-        with self.canvas.before:
-            Color(0.05, 0.05, 0.1, 1)
-            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_bg, size=self.update_bg)
-        
         self.add_widget(layout)
         
-    def update_bg(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
+    def refresh_records(self):
+        log = self.app.data_manager.concentration_log
+        today = log.day_stats(datetime.date.today())
+        best = log.best
+        mean = today and today['mean']
+        self.app.lang_manager.bind_text(
+            self.records_label, 'personal_best',
+            int(best) if best is not None else '—', int(mean) if mean is not None else '—'
+        )
         
+    @property
+    def game_active(self):
+        return self.state != self.IDLE
+        
+    def set_state(self, state, delay=None, callback=None):
+        """Перейти в состояние: отменить ожидающее событие, перекрасить круг, запланировать следующее"""
+        from kivy.core.window import Window
+        
+        if self.pending_event is not None:
+            self.pending_event.cancel()
+            self.pending_event = None
+        if self.state == self.ARMED:
+            Window.unbind(on_flip=self.on_green_presented)
+        self.state = state
+        self.circle_color.rgba = self.GREEN if state == self.ARMED else self.RED
+        self.armed_time = None
+        if state == self.ARMED:
+            # Время отсчитываем от первого кадра, в котором круг уже зелёный
+            Window.bind(on_flip=self.on_green_presented)
+        if callback is not None:
+            self.pending_event = Clock.schedule_once(callback, delay)
+            
     def start_game(self, instance):
         """Начать игру на концентрацию"""
         if not self.game_active:
-            self.game_active = True
             self.score = 0
             self.rounds = 0
-            self.start_btn.text = 'Stop'
+            self.session_stats = ReactionStats()
+            self.session_started = datetime.datetime.now().timestamp()
+            self.app.lang_manager.bind_text(self.instruction, 'focus_circle')
+            self.app.lang_manager.bind_text(self.start_btn, 'stop_button')
             self.start_btn.color = [1, 0.4, 0.4, 1]
             self.schedule_green_circle()
         else:
@@ -1013,42 +2905,38 @@ class ConcentrationScreen(Screen):
             
     def stop_game(self):
         """Остановить игру"""
-        self.game_active = False
-        self.start_btn.text = self.app.lang_manager.get_text('start_button')
+        self.set_state(self.IDLE)
+        self.app.lang_manager.bind_text(self.start_btn, 'start_button')
         self.start_btn.color = [0.8, 0.4, 1, 1]
-        Clock.unschedule(self.make_circle_green)
         
-        # Сделать круг красным
-        with self.game_circle.canvas:
-            Color(1, 0.4, 0.4, 1)
-            self.circle_shape = Ellipse(size=(100, 100), pos=self.circle_shape.pos)
+        # Итог сессии: медиана и p90 из потоковой гистограммы
+        stats = self.session_stats
+        if stats.count:
+            self.app.lang_manager.bind_text(
+                self.instruction, 'reaction_summary', int(stats.median), int(stats.p90)
+            )
             
-    def schedule_green_circle(self):
+    def schedule_green_circle(self, *args):
         """Запланировать появление зелёного круга"""
-        if self.game_active:
-            # Случайная задержка от 2 до 5 секунд
-            delay = random.uniform(2, 5)
-            Clock.schedule_once(self.make_circle_green, delay)
+        # Случайная задержка от 2 до 5 секунд
+        self.set_state(self.WAITING, random.uniform(2, 5), self.make_circle_green)
             
     def make_circle_green(self, dt):
         """Сделать круг зелёным"""
-        if self.game_active:
-            with self.game_circle.canvas:
-                Color(0.4, 1, 0.4, 1)  # Зелёный
-                self.circle_shape = Ellipse(size=(100, 100), pos=self.circle_shape.pos)
+        if self.state == self.WAITING:
+            # Возврат к красному через 2 секунды, если не нажали
+            self.set_state(self.ARMED, 2, self.make_circle_red)
             
-            self.reaction_start_time = Clock.get_time()
-            # Планируем возврат к красному через 2 секунды, если не нажали
-            Clock.schedule_once(self.make_circle_red, 2)
+    def on_green_presented(self, window):
+        """Кадр с зелёным кругом выведен на экран"""
+        window.unbind(on_flip=self.on_green_presented)
+        self.armed_time = time.perf_counter()
             
     def make_circle_red(self, dt):
-        """Вернуть круг к красному цвету"""
-        if self.game_active:
-            with self.game_circle.canvas:
-                Color(1, 0.4, 0.4, 1)  # Красный
-                self.circle_shape = Ellipse(size=(100, 100), pos=self.circle_shape.pos)
-            
-            # Планируем следующий раунд
+        """Вернуть круг к красному цвету (промах по времени)"""
+        if self.state == self.ARMED:
+            self.session_stats.add_miss()
+            self.app.data_manager.save_trial(self.session_started, None)
             self.schedule_green_circle()
             
     def on_circle_touch(self, instance, touch):
@@ -1056,115 +2944,129 @@ class ConcentrationScreen(Screen):
         if not self.game_active or not self.game_circle.collide_point(*touch.pos):
             return False
             
-        # Проверяем, зелёный ли круг
-        current_color = self.game_circle.canvas.children[-2].rgba  # Получаем цвет
-        if abs(current_color[1] - 1.0) < 0.1:  # Зелёный цвет
-            # Рассчитываем время реакции
-            reaction_time = (Clock.get_time() - self.reaction_start_time) * 1000
-            self.score += max(0, int(1000 - reaction_time))  # Больше очков за быструю реакцию
-            self.rounds += 1
-            
-            # Обновляем интерфейс
-            self.score_label.text = f'Score: {self.score}'
-            self.reaction_label.text = self.app.lang_manager.get_text('reaction_time').format(int(reaction_time))
-            
-            # Анимация успеха
-            anim = Animation(size=(120, 120), duration=0.1) + Animation(size=(100, 100), duration=0.1)
-            anim.start(self.circle_shape)
-            
-            # Сохраняем лучший результат
-            if reaction_time < 500:  # Хорошая реакция
-                self.app.data_manager.data['concentration_score'] = max(
-                    self.app.data_manager.data.get('concentration_score', 0),
-                    self.score
-                )
-            
-            # Возвращаем к красному и планируем следующий
-            Clock.unschedule(self.make_circle_red)
-            self.make_circle_red(0)
-            
+        if self.state == self.ARMED:
+            self.register_hit(touch)
+        return True
+        
+    def touch_time(self, touch):
+        """Момент касания по perf_counter()
+
+        touch.time_start ставится по time.time(), когда окно опрашивает SDL в
+        начале кадра, а не в момент касания: время события платформы Kivy не
+        передаёт. Поэтому момент касания квантован кадрами и запаздывает до
+        одного периода кадра (~17 мс при 60 Гц); armed_time тоже снят по кадру.
+        Возраст события переводит time_start на монотонные часы и убирает
+        только задержку между опросом и обработкой внутри кадра.
+        """
+        now = time.perf_counter()
+        if touch is None:
+            return now
+        age = max(0.0, time.time() - touch.time_start)
+        return now - age
+        
+    def register_hit(self, touch=None):
+        """Засчитать нажатие по зелёному кругу; False — фальстарт, не засчитан"""
+        # Цикл Kivy: Clock.tick() -> ввод -> on_flip. Круг уже ARMED, но касание,
+        # опрошенное до показа зелёного кадра, — фальстарт: не пишем и не считаем
+        if self.armed_time is None:
+            return False
+        # Рассчитываем время реакции от показа зелёного кадра
+        reaction_time = (self.touch_time(touch) - self.armed_time) * 1000
+        if reaction_time < 0:
+            return False
+        self.session_stats.add(reaction_time)
+        self.app.data_manager.save_trial(self.session_started, reaction_time)
+        self.score += max(0, int(1000 - reaction_time))  # Больше очков за быструю реакцию
+        self.rounds += 1
+        
+        # Обновляем интерфейс
+        self.score_label.text = f'Score: {self.score}'
+        self.app.lang_manager.bind_text(self.reaction_label, 'reaction_time', int(reaction_time))
+        self.refresh_records()
+        
+        # Анимация успеха
+        Animation.cancel_all(self.circle_shape)
+        anim = Animation(size=(120, 120), duration=0.1) + Animation(size=(100, 100), duration=0.1)
+        anim.start(self.circle_shape)
+        
+        # Сохраняем лучший результат
+        if reaction_time < 500:  # Хорошая реакция
+            self.app.data_manager.update_concentration_score(self.score)
+        
+        # Красный круг до конца анимации, затем следующий раунд
+        self.set_state(self.COOLDOWN, self.COOLDOWN_TIME, self.schedule_green_circle)
         return True
         
     def go_back(self, instance):
         """Вернуться на главный экран"""
         if self.game_active:
             self.stop_game()
-        self.app.root.transition = SlideTransition(direction='right')
-        self.app.root.current = 'main'
+        self.app.router.back()
 
 class EmotionalIntelligenceScreen(Screen):
-    """Экран развития эмоционального интеллекта"""
+    """Экран развития эмоционального интеллекта
+
+    Советы верстаются заранее: текстуры заголовка, текста, пояснения и
+    счётчика кэшируются по (язык, категория, номер, ширина), соседние советы
+    верстаются в свободных кадрах, и перелистывание только меняет текстуры.
+    """
+    LAYOUT_CACHE = 8  # свёрстанных советов в памяти (текстуры занимают видеопамять)
+    PREFETCH_DELAY = 0.05  # с: соседей верстаем после кадра перелистывания, а не в нём
+    
     def __init__(self, app, **kwargs):
         super().__init__(name='ei', **kwargs)
         self.app = app
         self.current_tip = 0
-        self.tips = [
-            {
-                'title': 'Self-Awareness',
-                'content': 'Take 5 minutes daily to identify and name your current emotions. This simple practice increases emotional vocabulary and self-understanding.',
-                'science': 'Research shows that labeling emotions activates the prefrontal cortex, which helps regulate emotional responses.'
-            },
-            {
-                'title': 'Empathy Building',
-                'content': 'When interacting with others, try to identify their emotional state before responding. Ask yourself: "What might they be feeling right now?"',
-                'science': 'Mirror neuron research indicates that consciously observing others\' emotions strengthens our empathic neural pathways.'
-            },
-            {
-                'title': 'Emotional Regulation',
-                'content': 'Use the "STOP" technique: Stop what you\'re doing, Take a breath, Observe your feelings, Proceed mindfully.',
-                'science': 'The pause between stimulus and response allows the prefrontal cortex to override automatic emotional reactions.'
-            },
-            {
-                'title': 'Social Skills',
-                'content': 'Practice active listening by summarizing what others say before adding your own thoughts. This builds stronger connections.',
-                'science': 'Studies show that feeling heard and understood releases oxytocin, strengthening social bonds and trust.'
-            },
-            {
-                'title': 'Motivation',
-                'content': 'Connect daily tasks to your larger values and goals. Ask: "How does this align with what matters most to me?"',
-                'science': 'Intrinsic motivation research shows that value-aligned activities increase dopamine and sustained effort.'
-            }
-        ]
+        # Советы читаются из пакетов постранично; встроенные пакеты дополняются скачанными
+        self.library = TipLibrary(
+            app.lang_manager.current_language,
+            pack_dirs=[TipLibrary.TIPS_DIR, os.path.join(app.user_data_dir, 'tips')],
+            cache_dir=os.path.join(app.user_data_dir, 'locales')
+        )
+        self.layouts = {}  # (язык, категория, номер, ширина) -> текстуры; от давних к свежим
+        self.layout_width = None
+        self.layout_misses = 0
+        self.prefetch_event = Clock.create_trigger(self.prefetch_tips, self.PREFETCH_DELAY)
         self.build_ui()
+        from kivy.core.window import Window
+        Window.bind(width=self.on_window_width)
         
     def build_ui(self):
+        from kivy.uix.scrollview import ScrollView
+        
+        # Фон экрана, карточек и кнопок — общий рендерер
+        self.backgrounds = BackgroundRenderer(self)
+        self.backgrounds.add(self, 'screen')
+        
         layout = BoxLayout(orientation='vertical', padding=dp(20), spacing=dp(20))
         
         # Заголовок
         title = Label(
-            text=self.app.lang_manager.get_text('ei_tip'),
             font_size='24sp',
             color=[1, 1, 1, 1],
-            size_hint_y=0.15
+            size_hint_y=0.1
         )
+        self.app.lang_manager.bind_text(title, 'ei_tip')
+        
+        # Выбор категории: по нажатию — следующая категория пакета
+        self.category_btn = NeumorphicButton(
+            renderer=self.backgrounds,
+            font_size='14sp',
+            color=[1, 0.8, 0.2, 1],
+            size_hint_y=0.08
+        )
+        self.category_btn.bind(on_press=self.next_category)
         
         # Контент совета (скроллируемый)
-        scroll = ScrollView(size_hint_y=0.6)
+        scroll = ScrollView(size_hint_y=0.57)
         content_layout = BoxLayout(orientation='vertical', spacing=dp(15), size_hint_y=None)
         content_layout.bind(minimum_height=content_layout.setter('height'))
         
         # Заголовок совета
-        self.tip_title = Label(
-            text=self.tips[0]['title'],
-            font_size='20sp',
-            color=[1, 0.8, 0.2, 1],  # Жёлтый
-            size_hint_y=None,
-            height=dp(40),
-            halign='center'
-        )
-        self.tip_title.bind(size=self.tip_title.setter('text_size'))
+        self.tip_title = TipText([1, 0.8, 0.2, 1], halign='center')  # Жёлтый
         
         # Основной контент
-        self.tip_content = Label(
-            text=self.tips[0]['content'],
-            font_size='16sp',
-            color=[1, 1, 1, 1],
-            size_hint_y=None,
-            text_size=(None, None),
-            halign='left',
-            valign='top'
-        )
-        self.tip_content.bind(texture_size=self.tip_content.setter('size'))
+        self.tip_content = TipText([1, 1, 1, 1])
         
         # Научное объяснение
         science_title = Label(
@@ -1177,17 +3079,7 @@ class EmotionalIntelligenceScreen(Screen):
         )
         science_title.bind(size=science_title.setter('text_size'))
         
-        self.science_content = Label(
-            text=self.tips[0]['science'],
-            font_size='14sp',
-            color=[0.8, 0.8, 0.8, 1],
-            size_hint_y=None,
-            text_size=(None, None),
-            halign='left',
-            valign='top',
-            italic=True
-        )
-        self.science_content.bind(texture_size=self.science_content.setter('size'))
+        self.science_content = TipText([0.8, 0.8, 0.8, 1])
         
         content_layout.add_widget(self.tip_title)
         content_layout.add_widget(Widget(size_hint_y=None, height=dp(10)))  # Разделитель
@@ -1202,20 +3094,17 @@ class EmotionalIntelligenceScreen(Screen):
         nav_layout = BoxLayout(size_hint_y=0.15, spacing=dp(10))
         
         prev_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='← Previous',
             font_size='14sp',
             color=[0.8, 0.4, 1, 1]  # Фиолетовый
         )
         prev_btn.bind(on_press=self.previous_tip)
         
-        self.tip_counter = Label(
-            text=f'1/{len(self.tips)}',
-            font_size='16sp',
-            color=[1, 0.8, 0.2, 1],
-            size_hint_x=0.3
-        )
+        self.tip_counter = TipText([1, 0.8, 0.2, 1], 'center', 'middle', size_hint_x=0.3)
         
         next_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='Next →',
             font_size='14sp',
             color=[0.8, 0.4, 1, 1]
@@ -1228,6 +3117,7 @@ class EmotionalIntelligenceScreen(Screen):
         
         # Кнопка возврата
         back_btn = NeumorphicButton(
+            renderer=self.backgrounds,
             text='← Back to Home',
             size_hint_y=0.1,
             font_size='16sp',
@@ -1236,43 +3126,102 @@ class EmotionalIntelligenceScreen(Screen):
         back_btn.bind(on_press=self.go_back)
         
         layout.add_widget(title)
+        layout.add_widget(self.category_btn)
         layout.add_widget(scroll)
         layout.add_widget(nav_layout)
         layout.add_widget(back_btn)
         
-        # Фон
-        with self.canvas.before:
-            Color(0.05, 0.05, 0.1, 1)
-            self.bg_rect = RoundedRectangle(pos=self.pos, size=self.size)
-        self.bind(pos=self.update_bg, size=self.update_bg)
-        
         self.add_widget(layout)
-        
-        # Обновляем размеры текста после добавления в layout
-        Clock.schedule_once(self.update_text_sizes, 0.1)
-        
-    def update_bg(self, *args):
-        self.bg_rect.pos = self.pos
-        self.bg_rect.size = self.size
-        
-    def update_text_sizes(self, dt):
-        """Обновить размеры текстовых полей"""
-        if self.width > 0:
-            self.tip_content.text_size = (self.width - dp(40), None)
-            self.science_content.text_size = (self.width - dp(40), None)
+        self.show_tip()
+        
+    def content_width(self):
+        """Ширина текста совета: окно за вычетом отступов раскладки"""
+        from kivy.core.window import Window
+        return int(Window.width - dp(40))
+        
+    def on_pre_enter(self):
+        # Язык или ширина окна могли смениться, пока экран был скрыт
+        if self.library.set_language(self.app.lang_manager.current_language):
+            self.current_tip = 0
+            self.show_tip()
+        elif self.layout_width != self.content_width():
+            self.show_tip()
+            
+    def on_window_width(self, window, width):
+        # Скрытый экран переверстается в on_pre_enter
+        if self.manager and self.manager.current == self.name:
+            self.show_tip()
+        
+    def show_tip(self):
+        """Показать текущий совет без анимации; соседние догрузятся в свободном кадре"""
+        category = self.library.category
+        self.category_btn.text = self.category_name(category)
+        count = len(self.library)
+        if not count:
+            for widget in (self.tip_title, self.tip_content, self.science_content, self.tip_counter):
+                widget.show(None)
+            return
+        title, content, science, counter = self.tip_layout(self.current_tip)
+        self.tip_title.show(title)
+        self.tip_content.show(content)
+        self.science_content.show(science)
+        self.tip_counter.show(counter)
+        self.prefetch_event()
+        
+    def layout_key(self, index):
+        return (self.library.language, self.library.category, index, self.content_width())
+        
+    def tip_layout(self, index):
+        """Текстуры совета index для текущих языка и ширины: из кэша или свёрстанные сейчас"""
+        key = self.layout_key(index)
+        layout = self.layouts.pop(key, None)
+        if layout is None:
+            tip = self.library.get(index)
+            width = key[3]
+            layout = (
+                TipText.render(tip.get('title', ''), sp(20), width, 'center'),
+                TipText.render(tip.get('content', ''), sp(16), width),
+                TipText.render(tip.get('science', ''), sp(14), width, italic=True),
+                TipText.render(f'{index + 1}/{len(self.library)}', sp(16), None),
+            )
+            self.layout_misses += 1
+            if len(self.layouts) >= self.LAYOUT_CACHE:
+                del self.layouts[next(iter(self.layouts))]
+        self.layouts[key] = layout
+        self.layout_width = key[3]
+        return layout
+        
+    def prefetch_tips(self, dt):
+        """Свободный кадр: страницы соседних советов и вёрстка одного соседа за кадр"""
+        self.library.prefetch(self.current_tip)
+        count = len(self.library)
+        for step in (1, -1):
+            index = (self.current_tip + step) % max(count, 1)
+            if count and self.layout_key(index) not in self.layouts:
+                self.tip_layout(index)
+                self.prefetch_event()  # второй сосед — в следующем кадре
+                return
+        
+    def category_name(self, category):
+        """Подпись категории из каталога; категории без перевода подписываются по ключу"""
+        if category is None:
+            return self.app.lang_manager.get_text('all_tips')
+        key = f'tip_category_{category}'
+        text = self.app.lang_manager.get_text(key)
+        return category.replace('_', ' ').capitalize() if text == key else text
+        
+    def next_category(self, instance):
+        """Следующая категория по кругу: все советы, затем категории пакета"""
+        categories = [None] + list(self.library.categories)
+        position = categories.index(self.library.category)
+        self.library.select(categories[(position + 1) % len(categories)])
+        self.current_tip = 0
+        self.update_tip_content()
         
     def update_tip_content(self):
         """Обновить содержимое совета"""
-        tip = self.tips[self.current_tip]
-        
-        # Обновляем содержимое
-        self.tip_title.text = tip['title']
-        self.tip_content.text = tip['content']
-        self.science_content.text = tip['science']
-        self.tip_counter.text = f'{self.current_tip + 1}/{len(self.tips)}'
-        
-        # Обновляем размеры
-        Clock.schedule_once(self.update_text_sizes, 0.1)
+        # Обновляем содержимое: готовые текстуры без задержки
+        self.show_tip()
         
         # Плавная анимация появления
         self.tip_content.opacity = 0
@@ -1286,38 +3235,400 @@ class EmotionalIntelligenceScreen(Screen):
         
     def next_tip(self, instance):
         """Следующий совет"""
-        self.current_tip = (self.current_tip + 1) % len(self.tips)
-        self.update_tip_content()
+        if len(self.library):
+            self.current_tip = (self.current_tip + 1) % len(self.library)
+            self.update_tip_content()
         
     def previous_tip(self, instance):
         """Предыдущий совет"""
-        self.current_tip = (self.current_tip - 1) % len(self.tips)
-        self.update_tip_content()
+        if len(self.library):
+            self.current_tip = (self.current_tip - 1) % len(self.library)
+            self.update_tip_content()
         
     def go_back(self, instance):
         """Вернуться на главный экран"""
-        self.app.root.transition = SlideTransition(direction='right')
-        self.app.root.current = 'main'
+        self.app.router.back()
+
+class LazyScreenManager(ScreenManager):
+    """Менеджер экранов, создающий экраны по фабрикам при первом переходе"""
+    LONG_FRAME = 2 / 60  # кадр дольше двух периодов 60 Гц — пользователь уже видит рывок
+    MAX_DEFER = 2.0      # с; дольше предпрогрев из-за длинных кадров не откладываем
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.factories = {}
+        self.build_times = {}  # имя экрана -> время построения, с
+        self.prewarm_deferred = {}  # имя экрана -> сколько предпрогрев ждал из-за длинных кадров, с
+
+    def register(self, name, factory):
+        """Зарегистрировать фабрику экрана; сам экран пока не создаётся"""
+        self.factories[name] = factory
+
+    def ensure_screen(self, name):
+        factory = self.factories.pop(name, None)
+        if factory is not None:
+            start = time.perf_counter()
+            self.add_widget(factory())
+            self.build_times[name] = time.perf_counter() - start
+
+    def get_screen(self, name):
+        self.ensure_screen(name)
+        return super().get_screen(name)
+
+    def has_screen(self, name):
+        return name in self.factories or super().has_screen(name)
+
+    def prewarm(self, names, delay=0.5):
+        """Построить экраны заранее, по одному в спокойный кадр, после показа главного
+
+        Построение экрана неделимо (экран ЭИ — десятки мс), и кадр с ним
+        всё равно будет длинным. Поэтому строим, только когда рывок не
+        заметен: нет перехода и касания, а предыдущий кадр уложился в
+        LONG_FRAME — иначе ждём следующего кадра. Без предпрогрева тот же
+        рывок пришёлся бы на первый переход к экрану. На медленном
+        устройстве спокойных кадров может не быть, поэтому из-за длинных
+        кадров ждём не дольше MAX_DEFER.
+        """
+        from kivy.base import EventLoop
+        pending = [name for name in names if name in self.factories]
+        deferred = [0.0]  # сколько уже откладываем из-за длинных кадров, с
+
+        def build_next(dt):
+            if self.transition.is_active or any(me.is_touch for me in EventLoop.touches):
+                Clock.schedule_once(build_next, 0)
+                return
+            if Clock.frametime > self.LONG_FRAME and deferred[0] < self.MAX_DEFER:
+                deferred[0] += Clock.frametime
+                Clock.schedule_once(build_next, 0)
+                return
+            while pending:
+                name = pending.pop(0)
+                if name in self.factories:
+                    self.ensure_screen(name)
+                    self.prewarm_deferred[name] = deferred[0]
+                    deferred[0] = 0.0
+                    Clock.schedule_once(build_next, 0)
+                    return
+
+        if pending:
+            Clock.schedule_once(build_next, delay)
+
+def count_instructions(widget):
+    """Инструкции canvas (before/основной/after) во всём дереве виджета"""
+    total = 0
+    for node in widget.walk(restrict=True):
+        canvas = node.canvas
+        total += len(canvas.children)
+        if canvas.has_before:
+            total += len(canvas.before.children)
+        if canvas.has_after:
+            total += len(canvas.after.children)
+    return total
+
+class FrameTimeStats(ReactionStats):
+    """Гистограмма стоимости кадров: корзины по 1 мс до 250 мс"""
+    BIN_MS = 1
+    MAX_MS = 250
+
+class Router:
+    """Навигация между экранами: переиспользуемые переходы, стек возврата и «Назад»
+
+    Объекты переходов создаются один раз. Пока идёт анимированный переход,
+    замеряется стоимость его кадров (как в Instrumentation); если медиана
+    SLOW_STREAK переходов подряд не укладывается в бюджет кадра, роутер
+    понижает уровень: слайд -> затухание -> без анимации. Выбранный уровень
+    сохраняется в настройках, чтобы слабое устройство не замерять заново.
+    """
+    LEVELS = ('slide', 'fade', 'none')
+    FRAME_BUDGET_MS = 1000 / 60
+    SLOW_STREAK = 2
+    KEY_BACK = 27  # Escape на десктопе, кнопка «Назад» на Android
+    
+    def __init__(self, app, manager, home='main'):
+        self.app = app
+        self.manager = manager
+        self.home = home
+        self.stack = []  # экраны, на которые вернёт back()
+        self.level = min(app.data_manager.data.get('transition_level', 0), len(self.LEVELS) - 1)
+        self.transitions = {
+            'left': SlideTransition(direction='left'),
+            'right': SlideTransition(direction='right'),
+            'fade': FadeTransition(duration=0.25),
+            'none': NoTransition(),
+        }
+        for transition in self.transitions.values():
+            transition.bind(on_complete=self.on_transition_complete)
+        self.costs = None  # FrameTimeStats текущего перехода
+        self.slow_streak = 0
+        self.last_median_ms = None
+        from kivy.core.window import Window
+        Window.bind(on_keyboard=self.on_keyboard)
+        
+    def go(self, name):
+        """Открыть экран name; текущий уходит в стек возврата"""
+        current = self.manager.current
+        if name == current:
+            return
+        if name in self.stack:
+            # Переход на экран из стека — это возврат, стек не растёт
+            del self.stack[self.stack.index(name):]
+            self.switch(name, 'right')
+        else:
+            self.stack.append(current)
+            self.switch(name, 'left')
+            
+    def back(self):
+        """Вернуться на предыдущий экран (или на главный); False — возвращаться некуда"""
+        if self.stack:
+            self.switch(self.stack.pop(), 'right')
+            return True
+        if self.manager.current != self.home:
+            self.switch(self.home, 'right')
+            return True
+        return False
+        
+    def switch(self, name, direction):
+        kind = self.LEVELS[self.level]
+        # Идущий переход останавливаем до замены: ScreenManager остановит уже
+        # новый объект, а старый доиграл бы и убрал с экрана уходящий экран.
+        # stop() вызывает on_complete — замер прерванного перехода закрывается
+        self.manager.transition.stop()
+        self.manager.transition = self.transitions[direction if kind == 'slide' else kind]
+        self.manager.current = name
+        if kind != 'none' and self.costs is None:
+            from kivy.core.window import Window
+            self.costs = FrameTimeStats()
+            Window.bind(on_flip=self.on_flip)
+        
+    def on_flip(self, window):
+        self.costs.add((Clock.time() - Clock.get_time()) * 1e3)
+        
+    def on_transition_complete(self, transition):
+        if self.costs is None:
+            return
+        from kivy.core.window import Window
+        Window.unbind(on_flip=self.on_flip)
+        costs, self.costs = self.costs, None
+        if not costs.count:
+            return
+        self.last_median_ms = costs.median
+        if self.last_median_ms <= self.FRAME_BUDGET_MS:
+            self.slow_streak = 0
+            return
+        self.slow_streak += 1
+        if self.slow_streak >= self.SLOW_STREAK and self.level < len(self.LEVELS) - 1:
+            self.level += 1
+            self.slow_streak = 0
+            self.app.data_manager.set_value('transition_level', self.level)
+            
+    def on_keyboard(self, window, key, *args):
+        """«Назад»: экран с go_back сам завершает свои сессии; на главном — выход"""
+        if key != self.KEY_BACK:
+            return False
+        screen = self.manager.current_screen
+        if screen.name == self.home and not self.stack:
+            return False
+        handler = getattr(screen, 'go_back', None)
+        if handler is not None:
+            handler(None)
+        else:
+            self.back()
+        return True
+
+class Instrumentation:
+    """Опциональные замеры производительности по экранам
+
+    Для каждого экрана: гистограмма стоимости кадра (от начала тика Clock до
+    flip, без сна до следующего кадра), максимум активных событий Clock и
+    анимаций, число инструкций canvas. Пока замеры выключены, к окну и Clock
+    ничего не привязано.
+    """
+    SAMPLE_INTERVAL = 0.5
+
+    def __init__(self, app):
+        self.app = app
+        self.enabled = False
+        self.frames = {}   # экран -> FrameTimeStats
+        self.screens = {}  # экран -> {'clock_events', 'animations', 'instructions'}
+        self.sample_event = None
+        self.overlay = None
+
+    def enable(self, overlay=True):
+        if self.enabled:
+            return
+        from kivy.core.window import Window
+        self.enabled = True
+        Window.bind(on_flip=self.on_flip)
+        self.sample_event = Clock.schedule_interval(self.sample, self.SAMPLE_INTERVAL)
+        if overlay:
+            self.show_overlay()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        from kivy.core.window import Window
+        self.enabled = False
+        Window.unbind(on_flip=self.on_flip)
+        self.sample_event.cancel()
+        self.sample_event = None
+        if self.overlay is not None:
+            Window.remove_widget(self.overlay)
+            self.overlay = None
+
+    def toggle(self):
+        """Переключить замеры с панелью; при выключении записать отчёт"""
+        if self.enabled:
+            self.dump()
+            self.disable()
+        else:
+            self.enable()
+
+    def on_flip(self, window):
+        cost = (Clock.time() - Clock.get_time()) * 1e3
+        name = self.app.root.current
+        stats = self.frames.get(name)
+        if stats is None:
+            stats = self.frames[name] = FrameTimeStats()
+        stats.add(cost)
+
+    def sample(self, dt=0):
+        """Снять счётчики текущего экрана и обновить панель"""
+        root = self.app.root
+        counters = self.screens.setdefault(
+            root.current, {'clock_events': 0, 'animations': 0, 'instructions': 0}
+        )
+        counters['clock_events'] = max(counters['clock_events'], len(Clock.get_events()))
+        # Запущенные анимации Kivy хранит в этом множестве класса
+        counters['animations'] = max(counters['animations'], len(Animation._instances))
+        counters['instructions'] = count_instructions(root.current_screen)
+        if self.overlay is not None:
+            self.overlay.text = self.summary(root.current)
+
+    def summary(self, name):
+        stats = self.frames.get(name)
+        counters = self.screens.get(name, {})
+        if stats is None or not stats.count:
+            frames = 'frames: -'
+        else:
+            frames = (
+                f'frames: {stats.count}  mean {stats.mean:.1f}  '
+                f'p50 {stats.median:.1f}  p90 {stats.p90:.1f} ms'
+            )
+        return (
+            f'{name}  {frames}\n'
+            f"clock {counters.get('clock_events', 0)}  "
+            f"anim {counters.get('animations', 0)}  "
+            f"canvas {counters.get('instructions', 0)}"
+        )
+
+    def show_overlay(self):
+        from kivy.core.window import Window
+        overlay = Label(
+            font_size='11sp',
+            color=[0.6, 1, 0.6, 1],
+            size_hint=(None, None)
+        )
+        with overlay.canvas.before:
+            Color(0, 0, 0, 0.6)
+            overlay.bg = Rectangle()
+
+        def update_rect(*args):
+            overlay.size = overlay.texture_size
+            overlay.bg.pos = overlay.pos
+            overlay.bg.size = overlay.size
+            overlay.top = Window.height
+
+        overlay.bind(texture_size=update_rect, pos=update_rect)
+        Window.add_widget(overlay)
+        self.overlay = overlay
+        self.sample()
+
+    def report(self):
+        """Сводка по всем экранам, которые попали в замеры"""
+        if self.enabled:
+            self.sample()
+        screens = {}
+        for name in sorted(set(self.frames) | set(self.screens)):
+            stats = self.frames.get(name) or FrameTimeStats()
+            screens[name] = dict(
+                self.screens.get(name, {}),
+                frames=stats.count,
+                frame_ms_mean=stats.mean,
+                frame_ms_median=stats.median,
+                frame_ms_p90=stats.p90,
+                frame_histogram=stats.histogram(),
+            )
+        return {'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'screens': screens}
+
+    def dump(self, path=None):
+        """Записать отчёт в JSON (по умолчанию в user_data_dir); вернуть путь"""
+        if path is None:
+            path = os.path.join(self.app.user_data_dir, 'mindwell-stats.json')
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+        return path
 
 class MindWellApp(App):
     """Основной класс приложения"""
     def build(self):
+        self.build_started = time.perf_counter()
         # Инициализация менеджеров
-        self.data_manager = DataManager()
-        self.lang_manager = LanguageManager()
+        self.data_manager = DataManager(os.path.join(self.user_data_dir, 'mindwell.db'))
+        self.lang_manager = LanguageManager(
+            self.data_manager.data['language'],
+            cache_dir=os.path.join(self.user_data_dir, 'locales')
+        )
         
         # Создание менеджера экранов
-        sm = ScreenManager()
-        sm.transition = SlideTransition()
+        sm = LazyScreenManager()
         
-        # Добавление экранов
+        # Главный экран строится сразу, остальные — при первом переходе
         sm.add_widget(MainScreen(self))
-        sm.add_widget(MoodScreen(self))
-        sm.add_widget(MeditationScreen(self))
-        sm.add_widget(ConcentrationScreen(self))
-        sm.add_widget(EmotionalIntelligenceScreen(self))
-        
+        sm.register('mood', lambda: MoodScreen(self))
+        sm.register('meditation', lambda: MeditationScreen(self))
+        sm.register('concentration', lambda: ConcentrationScreen(self))
+        sm.register('ei', lambda: EmotionalIntelligenceScreen(self))
+        
+        self.router = Router(self, sm)
+        self.instrumentation = Instrumentation(self)
+        self.build_time = time.perf_counter() - self.build_started
         return sm
+        
+    def on_start(self):
+        if PROFILE_STARTUP:
+            from kivy.core.window import Window
+            Window.bind(on_flip=self.on_first_frame)
+        # MINDWELL_DEBUG=1 — замеры и отладочная панель с самого старта
+        if os.environ.get('MINDWELL_DEBUG'):
+            self.instrumentation.enable()
+        # Догружаем вероятные следующие экраны, когда главный уже на экране
+        self.root.prewarm(['mood', 'meditation', 'concentration', 'ei'])
+        
+    def on_first_frame(self, window):
+        """Отчёт профилирования старта (только при MINDWELL_PROFILE)"""
+        window.unbind(on_flip=self.on_first_frame)
+        first_frame = time.perf_counter() - STARTUP_T0
+        if import_profiler:
+            import_profiler.uninstall()
+            import_profiler.report()
+        summary = {
+            'build_ms': self.build_time * 1e3,
+            'first_frame_ms': first_frame * 1e3,
+            'modules': len(sys.modules),
+        }
+        print('mindwell-startup ' + json.dumps(summary), file=sys.__stderr__)
+        if PROFILE_STARTUP == 'exit':
+            self.stop()
+
+    def on_pause(self):
+        # Android может завершить приложение на паузе без on_stop
+        self.data_manager.flush()
+        return True
+
+    def on_stop(self):
+        if self.instrumentation.enabled:
+            self.instrumentation.dump()
+        self.data_manager.close()
 
 # Запуск приложения
 if __name__ == '__main__':